@@ -0,0 +1,58 @@
+"""
+Micro-benchmark: per-request chain construction vs. the precompiled chain registry.
+
+Before the registry, every call to parse_resume / get_questions_from_resume /
+get_mock_questions / get_mock_rating built a PydanticOutputParser and a
+PromptTemplate, recomputed the format instructions and composed
+`prompt | model | parser` for every provider. This script times that work
+against a registry lookup for the same tasks.
+
+Run from the backend directory (needs the same .env as the server):
+    uv run python benchmark_chains.py
+"""
+import timeit
+
+from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import PromptTemplate
+
+from llms.chain_registry import build_chain
+from models.schemas import ParsedResume, QuestionListResponse, MockResponse, RatingResponse
+from utils.main_utils import chain_registry, llms, QUESTIONS_INPUTS, MOCK_QUESTIONS_INPUTS
+from utils.promts import parse_resume_prompt, questions_prompt, mock_question_prompt, rating_prompt
+
+ITERATIONS = 200
+
+TASKS = {
+    "parse_resume": (parse_resume_prompt, ["resume_text"], ParsedResume),
+    "questions": (questions_prompt, QUESTIONS_INPUTS, QuestionListResponse),
+    "mock_questions": (mock_question_prompt, MOCK_QUESTIONS_INPUTS, MockResponse),
+    "rating": (rating_prompt, ["question", "expected_answer", "user_answer"], RatingResponse),
+}
+
+
+def build_per_request(task: str):
+    """What every request used to do before the registry existed."""
+    template, input_variables, schema = TASKS[task]
+    parser = PydanticOutputParser(pydantic_object=schema)
+    prompt = PromptTemplate(
+        template=template,
+        input_variables=input_variables,
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+    return [build_chain(name, model, prompt, parser) for name, model in llms]
+
+
+def lookup_registry(task: str):
+    return [chain_registry.get(task, name) for name, _ in llms]
+
+
+def main():
+    print(f"{'task':<16}{'per-request (ms)':>18}{'registry (ms)':>16}{'speedup':>10}")
+    for task in TASKS:
+        before = timeit.timeit(lambda: build_per_request(task), number=ITERATIONS) / ITERATIONS * 1000
+        after = timeit.timeit(lambda: lookup_registry(task), number=ITERATIONS) / ITERATIONS * 1000
+        print(f"{task:<16}{before:>18.3f}{after:>16.4f}{before / after:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -71,10 +71,10 @@ class MongoDBClient:
         except Exception as e:
             raise MyException(e, sys)
 
-    async def find_one(self, collection_name: str, query: dict):
-        """Find a single document asynchronously."""
+    async def find_one(self, collection_name: str, query: dict, projection: dict = None):
+        """Find a single document asynchronously, optionally with only (or without) some fields."""
         try:
-            return await self.get_collection(collection_name).find_one(query)
+            return await self.get_collection(collection_name).find_one(query, projection)
         except Exception as e:
             raise MyException(e, sys)
 
@@ -90,10 +90,10 @@ class MongoDBClient:
         except Exception as e:
             raise MyException(e, sys)
 
-    async def update_one(self, collection_name: str, query: dict, update_data: dict):
-        """Update a document asynchronously."""
+    async def update_one(self, collection_name: str, query: dict, update_data: dict, upsert: bool = False):
+        """Update a document asynchronously (optionally inserting it if missing)."""
         try:
-            result = await self.get_collection(collection_name).update_one(query, {"$set": update_data})
+            result = await self.get_collection(collection_name).update_one(query, {"$set": update_data}, upsert=upsert)
             logging.info(f"Matched {result.matched_count}, Modified {result.modified_count}")
             return result.modified_count
         except Exception as e:
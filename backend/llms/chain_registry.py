@@ -0,0 +1,112 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.output_parsers import PydanticOutputParser
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from llms.context_cache import get_context_cache, context_cached_chain
+from utils.logger import logging
+
+# Use provider-native structured output (tool calling / JSON mode) for Pydantic results
+# instead of pasting the parser's JSON-schema format instructions into every prompt
+STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+STRUCTURED_OUTPUT_PROVIDERS = {
+    name.strip() for name in os.getenv("LLM_STRUCTURED_OUTPUT_PROVIDERS", "groq,gemini,grok").split(",") if name.strip()
+}
+# Replaces {format_instructions} when the schema is enforced by the provider
+STRUCTURED_OUTPUT_HINT = "Respond using the provided response schema."
+
+
+def _require_output(result):
+    # Structured output returns None when the model skips the tool call; fail so the parser fallback runs
+    if result is None:
+        raise ValueError("Structured output returned no result")
+    return result
+
+
+def build_chain(name: str, model, prompt, parser) -> Runnable:
+    """
+    Compose the chain for one provider.
+
+    Pydantic results use the provider's native structured output where enabled
+    and supported, with a short hint in place of the format instructions; the
+    classic `prompt | model | parser` chain is kept as a per-provider fallback
+    for when structured output is unsupported or fails.
+    """
+    parser_chain = prompt | model | parser
+    provider = name.partition(":")[0]
+    if not (STRUCTURED_OUTPUT and provider in STRUCTURED_OUTPUT_PROVIDERS and isinstance(parser, PydanticOutputParser)):
+        return parser_chain
+    try:
+        structured_model = model.with_structured_output(parser.pydantic_object)
+    except NotImplementedError:
+        return parser_chain
+    structured_chain = (
+        prompt.partial(format_instructions=STRUCTURED_OUTPUT_HINT)
+        | structured_model
+        | RunnableLambda(_require_output)
+    )
+    return structured_chain.with_fallbacks([parser_chain])
+
+
+def with_output_budget(name: str, model, max_tokens: int):
+    """
+    Copy of `model` with an output-token cap in the provider's own field.
+
+    The cap is set on the model itself rather than bound as a call kwarg,
+    because `with_structured_output` rebuilds the call from the model and
+    drops kwargs bound beforehand.
+    """
+    field = "max_output_tokens" if name.partition(":")[0] == "gemini" else "max_tokens"
+    return model.model_copy(update={field: max_tokens})
+
+
+class ChainRegistry:
+    """
+    Runnables built once per (task, provider) instead of on every request.
+
+    `register` compiles the prompt/parser pair for every provider up front.
+    Output-token-capped variants (see with_output_budget) are compiled on first
+    use and kept, since only a handful of distinct budgets ever occur. Tasks
+    registered with a context split (prefix prompt, tail prompt) go through the
+    provider's context cache where it has one (see llms.context_cache).
+    """
+
+    def __init__(self, providers: List[Tuple[str, Any]]):
+        self._models = dict(providers)
+        self._context_caches = {name: get_context_cache(name, model) for name, model in providers}
+        self._tasks: Dict[str, Tuple[Any, Any, Optional[Tuple[Any, Any]]]] = {}
+        self._chains: Dict[Tuple[str, str, Optional[int]], Runnable] = {}
+
+    def register(self, task: str, prompt, parser, context_split: Optional[Tuple[Any, Any]] = None) -> None:
+        self._tasks[task] = (prompt, parser, context_split)
+        for name, model in self._models.items():
+            self._chains[(task, name, None)] = self._build(task, name, model)
+
+    def _build(self, task: str, provider: str, model) -> Runnable:
+        prompt, parser, context_split = self._tasks[task]
+        chain = build_chain(provider, model, prompt, parser)
+        cache = self._context_caches.get(provider)
+        if context_split is None or cache is None:
+            return chain
+        prefix_prompt, tail_prompt = context_split
+        return context_cached_chain(cache, model, prefix_prompt, tail_prompt, parser, fallback=chain)
+
+    def get(self, task: str, provider: str, max_tokens: Optional[int] = None) -> Runnable:
+        key = (task, provider, max_tokens)
+        if key not in self._chains:
+            model = self._models[provider]
+            if max_tokens is not None:
+                model = with_output_budget(provider, model, max_tokens)
+            self._chains[key] = self._build(task, provider, model)
+        return self._chains[key]
+
+    def parser(self, task: str):
+        return self._tasks[task][1]
+
+    @property
+    def tasks(self) -> List[str]:
+        return list(self._tasks)
+
+    def log_summary(self) -> None:
+        logging.info(f"Chain registry ready: {len(self._tasks)} tasks x {len(self._models)} providers")
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from llms.stats import get_stats
+from utils.logger import logging
+
+# Breaker tuning (shared by every provider)
+ERROR_RATE_THRESHOLD = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LATENCY_THRESHOLD = float(os.getenv("LLM_BREAKER_P90_LATENCY_SECONDS", "45"))
+MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+WINDOW_SECONDS = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "60"))
+COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+PROBE_TIMEOUT = float(os.getenv("LLM_BREAKER_PROBE_TIMEOUT_SECONDS", "15"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for a single LLM provider.
+
+    The breaker reads the provider's rolling stats (recorded by protected_invoke)
+    and opens when the error rate or p90 latency over the last WINDOW_SECONDS
+    crosses its threshold. While open, callers skip the provider. Once the
+    cooldown has passed, a single background probe runs (half-open); success
+    closes the breaker, failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._closed_at = 0.0   # ignore calls recorded before the last recovery
+        self._probe: Optional[asyncio.Task] = None
+
+    def allow_request(self) -> bool:
+        return self.state == CLOSED
+
+    def health(self) -> float:
+        """Score in [0, 1]: success rate, scaled down when p90 latency exceeds the threshold."""
+        if self.state != CLOSED:
+            return 0.0
+        since = max(self._closed_at, time.monotonic() - WINDOW_SECONDS)
+        calls = get_stats(self.provider).recent(since)
+        if not calls:
+            return 1.0
+        success_rate = sum(1 for _, _, ok in calls if ok) / len(calls)
+        p90 = get_stats(self.provider).latency_percentile(0.9, since)
+        if p90 and p90 > LATENCY_THRESHOLD:
+            success_rate *= LATENCY_THRESHOLD / p90
+        return success_rate
+
+    def evaluate(self) -> None:
+        """Re-check the rolling window and open the breaker if the provider looks unhealthy."""
+        if self.state != CLOSED:
+            return
+        since = max(self._closed_at, time.monotonic() - WINDOW_SECONDS)
+        calls = get_stats(self.provider).recent(since)
+        if len(calls) < MIN_CALLS:
+            return
+
+        error_rate = sum(1 for _, _, ok in calls if not ok) / len(calls)
+        p90 = get_stats(self.provider).latency_percentile(0.9, since)
+        if error_rate >= ERROR_RATE_THRESHOLD:
+            self._open(f"error rate {error_rate:.0%} over {len(calls)} calls")
+        elif p90 is not None and p90 > LATENCY_THRESHOLD:
+            self._open(f"p90 latency {p90:.1f}s")
+
+    def maybe_probe(self, probe: Callable[[], Awaitable]) -> None:
+        """Start a background probe if the breaker is open and its cooldown has elapsed."""
+        if self.state != OPEN or time.monotonic() - self._opened_at < COOLDOWN_SECONDS:
+            return
+        self.state = HALF_OPEN
+        self._probe = asyncio.create_task(self._run_probe(probe))
+
+    async def _run_probe(self, probe: Callable[[], Awaitable]) -> None:
+        try:
+            await asyncio.wait_for(probe(), timeout=PROBE_TIMEOUT)
+        except Exception as exc:
+            self._open(f"probe failed: {exc}")
+            return
+        self.state = CLOSED
+        self._closed_at = time.monotonic()
+        logging.info(f"[circuit_breaker] {self.provider} recovered, breaker closed")
+
+    def _open(self, reason: str) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        logging.warning(f"[circuit_breaker] {self.provider} breaker opened: {reason}")
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "health": round(self.health(), 3)}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Return the shared breaker for a provider, creating it on first use."""
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(provider)
+    return _breakers[provider]
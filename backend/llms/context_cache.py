@@ -0,0 +1,170 @@
+"""
+Provider-side context caching for the per-user part of a prompt.
+
+Prompts that support it are split into a prefix (static instructions, output
+format and the candidate's resume) and a per-request tail. The rendered
+prefix is registered once with the provider and referenced by handle on later
+calls, so repeated generations for the same resume only send the tail.
+
+Backends (LLM_CONTEXT_CACHE):
+- "provider" (default): explicit context caching where the provider has it,
+  i.e. Gemini cached content; other providers get no cache and rely on their
+  automatic prefix caching, which the prefix-stable layout already helps.
+- "off": always send the full prompt.
+
+Prefixes shorter than LLM_CONTEXT_CACHE_MIN_CHARS are never cached (Gemini
+rejects caches under ~1024 tokens). Any failure to create or use a cache falls
+back to the task's regular chain.
+"""
+import asyncio
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from google.ai.generativelanguage_v1beta import CacheServiceAsyncClient, CachedContent, Content, Part
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from llms import singleflight
+from llms.deadline import DeadlineExceeded
+from llms.llmFactory import GOOGLE_API_KEY
+from utils.logger import logging
+
+CONTEXT_CACHE_BACKEND = os.getenv("LLM_CONTEXT_CACHE", "provider").lower()
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("LLM_CONTEXT_CACHE_TTL_SECONDS", "900"))
+CONTEXT_CACHE_MIN_CHARS = int(os.getenv("LLM_CONTEXT_CACHE_MIN_CHARS", "4000"))
+CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CONTEXT_CACHE_MAX_ENTRIES", "1000"))
+# A handle this close to expiry is replaced rather than used for a new call
+REFRESH_MARGIN_SECONDS = 60.0
+# After a failed creation, don't retry the same prefix for this long
+FAILURE_BACKOFF_SECONDS = 300.0
+
+
+class ContextCache(ABC):
+    """
+    Handles for rendered prompt prefixes on one provider model.
+
+    Subclasses implement `_create` (register a prefix, return its handle) and
+    `bind` (the model call that uses a handle). Handles are kept per process
+    until shortly before they expire; concurrent requests for the same prefix
+    share one creation.
+    """
+
+    def __init__(self, provider: str, model_name: str):
+        self.provider = provider
+        self.model_name = model_name
+        self._handles: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._failed: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def _key(self, prefix: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x1f{prefix}".encode()).hexdigest()
+
+    async def handle(self, prefix: str) -> Optional[str]:
+        """Handle for `prefix`, registering it on first use; None when it shouldn't or can't be cached."""
+        if len(prefix) < CONTEXT_CACHE_MIN_CHARS:
+            return None
+        key = self._key(prefix)
+        now = asyncio.get_running_loop().time()
+        entry = self._handles.get(key)
+        if entry and entry[1] - now > REFRESH_MARGIN_SECONDS:
+            self._handles.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        if self._failed.get(key, 0.0) > now:
+            return None
+        try:
+            return await singleflight.do(f"context_cache:{self.provider}:{key}", lambda: self._register(key, prefix))
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            self.failures += 1
+            self._failed[key] = now + FAILURE_BACKOFF_SECONDS
+            logging.warning(f"[context_cache] {self.provider} could not cache prompt prefix: {e}")
+            return None
+
+    async def _register(self, key: str, prefix: str) -> str:
+        handle = await self._create(prefix)
+        self.misses += 1
+        self._handles[key] = (handle, asyncio.get_running_loop().time() + CONTEXT_CACHE_TTL_SECONDS)
+        while len(self._handles) > CONTEXT_CACHE_MAX_ENTRIES:
+            self._handles.popitem(last=False)
+        logging.info(f"[context_cache] {self.provider} cached a {len(prefix)}-char prompt prefix")
+        return handle
+
+    @abstractmethod
+    async def _create(self, prefix: str) -> str:
+        """Register `prefix` with the provider and return its handle."""
+
+    @abstractmethod
+    def bind(self, model, handle: str, tail_prompt) -> Runnable:
+        """`tail_prompt | model` with the cached prefix in front of the tail."""
+
+    def snapshot(self) -> dict:
+        return {"entries": len(self._handles), "hits": self.hits, "misses": self.misses, "failures": self.failures}
+
+
+class GeminiContextCache(ContextCache):
+    """Gemini cached content: the prefix is stored server-side and referenced via `cached_content`."""
+
+    def __init__(self, provider: str, model_name: str):
+        super().__init__(provider, model_name)
+        self._client = None
+
+    async def _create(self, prefix: str) -> str:
+        if self._client is None:
+            self._client = CacheServiceAsyncClient(client_options={"api_key": GOOGLE_API_KEY})
+        cached = await self._client.create_cached_content(
+            cached_content=CachedContent(
+                model=self.model_name,
+                contents=[Content(role="user", parts=[Part(text=prefix)])],
+                ttl=timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS),
+            )
+        )
+        return cached.name
+
+    def bind(self, model, handle: str, tail_prompt) -> Runnable:
+        return tail_prompt | model.bind(cached_content=handle)
+
+
+_caches: Dict[str, ContextCache] = {}
+
+
+def get_context_cache(provider: str, model) -> Optional[ContextCache]:
+    """The provider's context cache under the configured backend, or None when it has none."""
+    if provider in _caches:
+        return _caches[provider]
+    model_name = getattr(model, "model", None) or getattr(model, "model_name", None) or provider
+    if CONTEXT_CACHE_BACKEND == "provider" and provider.partition(":")[0] == "gemini":
+        cache = GeminiContextCache(provider, model_name)
+    else:
+        return None
+    _caches[provider] = cache
+    return cache
+
+
+def all_context_caches() -> Dict[str, ContextCache]:
+    return dict(_caches)
+
+
+def context_cached_chain(cache: ContextCache, model, prefix_prompt, tail_prompt, parser, fallback: Runnable) -> Runnable:
+    """
+    Chain that renders the prompt prefix, gets (or registers) its handle and
+    sends only the tail against it, falling back to `fallback` (the task's
+    regular chain) when the prefix isn't cached or the cached call fails.
+
+    The cached call always uses the text parser: the output format is part of
+    the cached prefix, and Gemini refuses tool/structured-output settings on
+    requests that use cached content.
+    """
+    async def route(input_data: dict) -> Runnable:
+        prefix = prefix_prompt.invoke(input_data).to_string()
+        handle = await cache.handle(prefix)
+        if handle is None:
+            return fallback
+        return (cache.bind(model, handle, tail_prompt) | parser).with_fallbacks([fallback])
+    return RunnableLambda(route)
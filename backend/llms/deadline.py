@@ -0,0 +1,96 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Request-scoped deadlines. A router sets one from its endpoint's budget; every
+# LLM call made while serving the request (scheduler waits, each retry attempt,
+# hedged providers, coalesced followers) is bounded by the time that is left.
+# Budgets stay under the load balancer's 60s timeout so the client gets a 504
+# from us instead of a dropped connection.
+_DEFAULT_BUDGETS = {
+    "upload_resume": 50.0,
+    "questions": 55.0,
+    "mock_questions": 55.0,
+    "rating": 30.0,
+    "rating_batch": 55.0,
+    "bot": 25.0,
+    # SSE streams keep the connection busy as questions arrive, so they may run longer
+    "questions_stream": 120.0,
+    "mock_questions_stream": 120.0,
+}
+# Cap on a single provider attempt, however much budget remains
+CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "45"))
+# Caps on a streamed attempt: the wait for its first chunk, and between later chunks
+STREAM_FIRST_CHUNK_TIMEOUT = float(os.getenv("LLM_STREAM_FIRST_CHUNK_TIMEOUT_SECONDS", "20"))
+STREAM_CHUNK_TIMEOUT = float(os.getenv("LLM_STREAM_CHUNK_TIMEOUT_SECONDS", "10"))
+# Don't start a retry with less time than this left
+MIN_ATTEMPT_SECONDS = float(os.getenv("LLM_MIN_ATTEMPT_SECONDS", "2"))
+
+# Absolute deadline in event-loop time (asyncio's monotonic clock)
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the LLM work finished."""
+
+
+def endpoint_budget(name: str) -> float:
+    """Seconds allowed for endpoint `name`; override with REQUEST_BUDGET_<NAME>_SECONDS."""
+    return float(os.getenv(f"REQUEST_BUDGET_{name.upper()}_SECONDS", _DEFAULT_BUDGETS[name]))
+
+
+def set_deadline(seconds: Optional[float]) -> None:
+    """Start the current request's budget now (None clears it)."""
+    _deadline.set(None if seconds is None else asyncio.get_running_loop().time() + seconds)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None when no deadline applies."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+def attempt_timeout(cap: float = CALL_TIMEOUT) -> float:
+    """Timeout for the next provider attempt (or streamed chunk): `cap`, shrunk to the remaining budget."""
+    left = remaining()
+    return cap if left is None else max(0.0, min(cap, left))
+
+
+@contextmanager
+def deadline_margin(seconds: float):
+    """Run the block against a deadline `seconds` before the current one, leaving the caller time to use what finished."""
+    deadline = _deadline.get()
+    token = _deadline.set(None if deadline is None else deadline - seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@asynccontextmanager
+async def within_deadline():
+    """Cancel the block when the current deadline passes, raising DeadlineExceeded."""
+    deadline = _deadline.get()
+    if deadline is None:
+        yield
+        return
+    timeout = asyncio.timeout_at(deadline)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError as e:
+        # Only our own expiry; a per-attempt timeout inside the block is left alone
+        if timeout.expired():
+            raise DeadlineExceeded("Request deadline exceeded") from e
+        raise
+
+
+def request_budget(name: str):
+    """FastAPI dependency that starts the endpoint's deadline when the request is handled."""
+    async def dependency() -> None:
+        set_deadline(endpoint_budget(name))
+    return dependency
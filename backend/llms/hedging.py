@@ -0,0 +1,91 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable
+
+from llms import routing
+from llms.wrapper import protected_invoke
+from utils.logger import logging
+
+# Hedged invocation: start the next provider if the current one has not
+# answered within its rolling p90 latency for the task group being served
+# (see llms.routing), and keep whichever answers first.
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+# Used until a route has latency history of its own for the task group
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "8"))
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+
+
+def hedge_delay(route: str) -> float:
+    """Seconds to wait on `route` before firing the next one."""
+    # Per task group: a provider's 2s ratings and 40s question sets share no useful p90
+    observed = routing.latency_percentile(route, HEDGE_PERCENTILE)
+    if observed is None:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, observed)
+
+
+async def hedged_invoke(chains: List[Tuple[str, Runnable]], input_data: Dict[str, Any]) -> Any | None:
+    """
+    Race provider chains with staggered starts.
+
+    The first chain starts immediately. The next one is fired when the most
+    recently started chain exceeds its hedge delay, or as soon as a running
+    chain fails. The first non-empty result wins and the remaining calls
+    are cancelled. Returns None if every provider fails.
+    """
+    remaining = iter(chains)
+    pending: Dict[asyncio.Task, str] = {}
+    last_started: Optional[str] = None
+
+    def launch_next() -> bool:
+        nonlocal last_started
+        nxt = next(remaining, None)
+        if nxt is None:
+            return False
+        name, chain = nxt
+        task = asyncio.create_task(protected_invoke(chain, input_data, provider=name))
+        pending[task] = name
+        last_started = name
+        return True
+
+    exhausted = not launch_next()
+    try:
+        while pending:
+            timeout = None if exhausted else hedge_delay(last_started)
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                logging.info(f"[hedged_invoke] {last_started} slower than {timeout:.1f}s, hedging")
+                exhausted = not launch_next()
+                continue
+
+            for task in done:
+                name = pending.pop(task)
+                result = task.result()
+                if result:
+                    logging.info(f"[hedged_invoke] result served by {name}")
+                    return result
+                logging.warning(f"[hedged_invoke] {name} returned no result")
+
+            # Every finished call failed: move on to the next provider right away
+            if not exhausted:
+                exhausted = not launch_next()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def invoke_with_fallback(chains: List[Tuple[str, Runnable]], input_data: Dict[str, Any]) -> Any | None:
+    """Run provider chains hedged, or strictly one after another when hedging is disabled."""
+    if HEDGE_ENABLED:
+        return await hedged_invoke(chains, input_data)
+
+    for name, chain in chains:
+        result = await protected_invoke(chain, input_data, provider=name)
+        if result:
+            return result
+    return None
@@ -1,6 +1,8 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_xai import ChatXAI
 from langchain_groq import ChatGroq
+from llms.routing import all_routes, split_route
+from llms.transport import shared_async_client
 from utils.logger import logging
 import os
 from dotenv import load_dotenv
@@ -31,6 +33,7 @@ class LLMFactory:
             temperature=0.2,
             verbose=True,
             api_key=GROK_API_KEY,
+            http_async_client=shared_async_client(),
         )
     
     @staticmethod
@@ -40,8 +43,21 @@ class LLMFactory:
             temperature=0.2,
             verbose=True,
             api_key=GROQ_API_KEY,
+            http_async_client=shared_async_client(),
         )
 
     @staticmethod
-    def get_all_providers():
-        return [ LLMFactory.groq(),LLMFactory.gemini(), LLMFactory.grok()]
\ No newline at end of file
+    def create(provider: str, model: str | None = None):
+        """A provider's client for `model`, or its default model when None."""
+        factories = {"groq": LLMFactory.groq, "gemini": LLMFactory.gemini, "grok": LLMFactory.grok}
+        if provider not in factories:
+            raise ValueError(f"Unknown LLM provider {provider!r} in routing table")
+        return factories[provider](model) if model else factories[provider]()
+
+    @staticmethod
+    def get_routed_providers():
+        """
+        One client per model route in the routing table (see llms.routing),
+        named by its route: "groq" for the default model, "groq:<model>" otherwise.
+        """
+        return [(route, LLMFactory.create(*split_route(route))) for route in all_routes()]
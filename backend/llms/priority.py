@@ -0,0 +1,67 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Priority classes for LLM work, most urgent first. Interactive calls (ratings,
+# bot answers) are what a user is actively waiting on; generation is question
+# sets and resume parsing; background is speculative work like pre-generation.
+PRIORITY_CLASSES = ("interactive", "generation", "background")
+DEFAULT_PRIORITY = "generation"
+ANONYMOUS_USER = "anonymous"
+
+# Share of contended provider slots each class gets, e.g.
+# LLM_PRIORITY_SHARES="interactive=70,generation=25,background=5"
+_DEFAULT_SHARES = {"interactive": 70.0, "generation": 25.0, "background": 5.0}
+
+# Set by callers and inherited by every task they spawn (hedged calls, batches)
+_priority: ContextVar[Optional[str]] = ContextVar("llm_priority", default=None)
+_user: ContextVar[Optional[str]] = ContextVar("llm_user", default=None)
+
+
+def priority_shares() -> Dict[str, float]:
+    shares = dict(_DEFAULT_SHARES)
+    for item in os.getenv("LLM_PRIORITY_SHARES", "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() in shares and value.strip():
+            shares[name.strip()] = max(0.01, float(value))
+    return shares
+
+
+def current_priority() -> str:
+    return _priority.get() or DEFAULT_PRIORITY
+
+
+def current_user() -> str:
+    return _user.get() or ANONYMOUS_USER
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """
+    Run the block's LLM calls in `priority`, unless an enclosing block already
+    chose a less urgent class (so background work that calls an interactive
+    helper stays background).
+    """
+    enclosing = _priority.get()
+    if enclosing and PRIORITY_CLASSES.index(enclosing) > PRIORITY_CLASSES.index(priority):
+        priority = enclosing
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def set_llm_user(user_id: Optional[str]) -> None:
+    """Attribute the current request's LLM calls to `user_id` for per-user fair queuing."""
+    _user.set(user_id)
+
+
+@contextmanager
+def llm_user(user_id: Optional[str]):
+    token = _user.set(user_id)
+    try:
+        yield
+    finally:
+        _user.reset(token)
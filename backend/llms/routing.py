@@ -0,0 +1,174 @@
+"""
+Task-aware model routing.
+
+Each task group (parse, generate, mock_generate, rate, bot) has an ordered
+list of model routes to try. A route is a provider name ("groq"), meaning its
+default LLMFactory model, or "provider:model" for another model on the same
+provider ("groq:llama-3.1-8b-instant"). Short tasks start on small, fast
+models; long generations keep the large ones.
+
+The table is configurable without code changes: LLM_ROUTES (a JSON object)
+or LLM_ROUTES_FILE (path to a JSON file) maps group names to route lists and
+replaces the default for every group it names.
+
+The configured order is the starting point. Each route's latency and success
+rate are measured per task group; once a route has ROUTING_MIN_CALLS calls
+for a group within ROUTING_WINDOW_SECONDS, it is ranked among the other
+measured routes by expected time to a good answer (p50 latency / success
+rate). Unmeasured routes keep their configured position, so a newly added
+model is tried where it was put. A call cancelled because another route
+answered first counts as a miss for the slower route, so hedging alone is
+enough to promote a faster model.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from llms.stats import get_stats
+from utils.logger import logging
+
+TASK_GROUPS = ("parse", "generate", "mock_generate", "rate", "bot")
+
+_DEFAULT_ROUTES = {
+    "parse": ["groq", "gemini", "grok"],
+    "generate": ["groq", "gemini", "grok"],
+    "mock_generate": ["groq", "gemini", "grok"],
+    "rate": ["groq:llama-3.1-8b-instant", "groq", "gemini", "grok"],
+    "bot": ["groq:llama-3.1-8b-instant", "groq", "gemini", "grok"],
+}
+# Registry task -> group, for tasks whose group isn't obvious from the name
+_TASK_GROUPS = {"questions": "generate", "mock_questions": "mock_generate", "rating": "rate", "bot": "bot"}
+
+ROUTING_MIN_CALLS = int(os.getenv("LLM_ROUTING_MIN_CALLS", "5"))
+# Only recent calls count; a route with no recent calls falls back to its configured position
+ROUTING_WINDOW_SECONDS = float(os.getenv("LLM_ROUTING_WINDOW_SECONDS", "600"))
+# Success rates below this are clamped so a failing route sorts last instead of dividing by ~0
+MIN_SUCCESS_RATE = 0.05
+
+# The task whose calls are being made, so their outcome is recorded against its group
+_task: ContextVar[Optional[str]] = ContextVar("llm_task", default=None)
+
+
+def task_group(task: str) -> str:
+    """Routing group of a chain-registry task, e.g. "questions_batch" -> "generate"."""
+    if task == "parse_resume" or task.startswith("resume_section:"):
+        return "parse"
+    base = task.removesuffix("_batch").removesuffix("_stream")
+    return _TASK_GROUPS.get(base, "generate")
+
+
+def split_route(route: str) -> Tuple[str, Optional[str]]:
+    """("provider", model or None for the provider's default model)."""
+    provider, _, model = route.partition(":")
+    return provider, model or None
+
+
+def _load_overrides() -> Dict[str, List[str]]:
+    raw = os.getenv("LLM_ROUTES")
+    path = os.getenv("LLM_ROUTES_FILE")
+    if not raw and path:
+        with open(path) as f:
+            raw = f.read()
+    if not raw:
+        return {}
+    overrides = {}
+    for group, routes in json.loads(raw).items():
+        if group not in TASK_GROUPS or not isinstance(routes, list) or not routes:
+            logging.warning(f"Ignoring routing table entry {group!r}: expected one of {TASK_GROUPS} with a list of routes")
+            continue
+        overrides[group] = [str(route) for route in routes]
+    return overrides
+
+
+def _build_table() -> Dict[str, List[str]]:
+    table = dict(_DEFAULT_ROUTES)
+    try:
+        table.update(_load_overrides())
+    except (OSError, ValueError) as e:
+        logging.error(f"Invalid LLM routing table, using the defaults: {e}")
+    return table
+
+
+ROUTES = _build_table()
+
+
+def all_routes() -> List[str]:
+    """Every route in the table, each once, in first-seen order."""
+    return list(dict.fromkeys(route for routes in ROUTES.values() for route in routes))
+
+
+def _stats_key(group: str, route: str) -> str:
+    return f"{group}@{route}"
+
+
+def _recent_calls(group: str, route: str) -> list:
+    return get_stats(_stats_key(group, route)).recent(time.monotonic() - ROUTING_WINDOW_SECONDS)
+
+
+def expected_latency(group: str, route: str) -> Optional[float]:
+    """p50 latency over success rate for `route` in `group`, or None until it has enough recent calls."""
+    calls = _recent_calls(group, route)
+    if len(calls) < ROUTING_MIN_CALLS:
+        return None
+    success_rate = max(MIN_SUCCESS_RATE, sum(1 for _, _, ok in calls if ok) / len(calls))
+    latencies = sorted(latency for _, latency, ok in calls if ok)
+    if not latencies:
+        # Nothing succeeded: rank by how long the failures took
+        latencies = sorted(latency for _, latency, _ in calls)
+    return latencies[len(latencies) // 2] / success_rate
+
+
+def latency_percentile(route: str, q: float) -> Optional[float]:
+    """Recent latency at quantile q for `route` in the current task's group, or None outside llm_task or without history."""
+    task = _task.get()
+    if not task:
+        return None
+    return get_stats(_stats_key(task_group(task), route)).latency_percentile(q, since=time.monotonic() - ROUTING_WINDOW_SECONDS)
+
+
+def _ordered(group: str) -> List[str]:
+    routes = ROUTES[group]
+    scores = {route: expected_latency(group, route) for route in routes}
+    measured = [i for i, route in enumerate(routes) if scores[route] is not None]
+    ranked = sorted((routes[i] for i in measured), key=lambda route: scores[route])
+    ordered = list(routes)
+    for i, route in zip(measured, ranked):
+        ordered[i] = route
+    return ordered
+
+
+def ordered_routes(task: str) -> List[str]:
+    """The task's routes, with measured routes re-ranked within the positions they hold in the table."""
+    return _ordered(task_group(task))
+
+
+@contextmanager
+def llm_task(task: str):
+    """Attribute the block's LLM calls to `task` for per-group route stats."""
+    token = _task.set(task)
+    try:
+        yield
+    finally:
+        _task.reset(token)
+
+
+def record(route: Optional[str], latency: float, succeeded: bool) -> None:
+    """Record a call outcome against the current task's group (no-op outside llm_task)."""
+    task = _task.get()
+    if route and task:
+        get_stats(_stats_key(task_group(task), route)).record(latency, succeeded=succeeded)
+
+
+def snapshot() -> Dict[str, list]:
+    """Current route order per group with each route's expected latency, for /metrics/llm."""
+    return {
+        group: [
+            {"route": route, "expected_latency": expected_latency(group, route),
+             "calls": len(_recent_calls(group, route))}
+            for route in _ordered(group)
+        ]
+        for group in ROUTES
+    }
@@ -0,0 +1,319 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Tuple
+
+from llms.priority import PRIORITY_CLASSES, priority_shares, current_priority, current_user
+from llms.stats import get_stats
+from utils.logger import logging
+
+# Default quotas per provider. Each can be overridden with
+# LLM_<PROVIDER>_RPM / _TPM / _MAX_CONCURRENCY / _TARGET_LATENCY_SECONDS.
+# Every model route ("groq:llama-3.1-8b-instant", see llms.routing) gets its own
+# scheduler with its provider's quotas, as provider rate limits are per model.
+_DEFAULT_QUOTAS = {
+    "groq":    {"rpm": 30, "tpm": 12000,  "max_concurrency": 8,  "target_latency": 15.0},
+    "gemini":  {"rpm": 15, "tpm": 250000, "max_concurrency": 8,  "target_latency": 20.0},
+    "grok":    {"rpm": 60, "tpm": 100000, "max_concurrency": 8,  "target_latency": 20.0},
+    "default": {"rpm": 30, "tpm": 50000,  "max_concurrency": 5,  "target_latency": 20.0},
+}
+MIN_CONCURRENCY = 1
+
+
+def _quota(provider: str, key: str) -> float:
+    provider = provider.partition(":")[0]
+    defaults = _DEFAULT_QUOTAS.get(provider, _DEFAULT_QUOTAS["default"])
+    env_key = f"LLM_{provider.upper()}_{key.upper()}"
+    if key == "target_latency":
+        env_key += "_SECONDS"
+    return float(os.getenv(env_key, defaults[key]))
+
+
+def max_concurrency(provider: str) -> int:
+    """Upper bound on concurrent calls the provider's scheduler will allow."""
+    return int(_quota(provider, "max_concurrency"))
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `capacity` tokens, refilled continuously over one minute.
+
+    It never sleeps itself: the scheduler asks how long `amount` would take to
+    become available and takes it once it is, so waiting callers are served in
+    the scheduler's fair order rather than whoever wakes up first.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class FairQueue:
+    """
+    Waiting calls, grouped by priority class and then by user.
+
+    Classes are served by stride scheduling: each class's pass value advances
+    by 1/share whenever it is served and the non-empty class whose pass would
+    be lowest goes next, so under contention each class gets slots in proportion
+    to its share and no class is starved outright. Within a class, users are
+    served round robin, so one user's 50-question generation queues behind
+    their own calls rather than everyone else's.
+    """
+
+    def __init__(self, shares: Dict[str, float]):
+        self.shares = shares
+        # class -> user -> [(waiter, enqueued_at), ...]
+        self._waiting: Dict[str, "OrderedDict[str, Deque[Tuple[asyncio.Future, float]]]"] = {
+            name: OrderedDict() for name in PRIORITY_CLASSES
+        }
+        self._pass = {name: 0.0 for name in PRIORITY_CLASSES}
+        self._waits: Dict[str, Deque[float]] = {name: deque(maxlen=200) for name in PRIORITY_CLASSES}
+
+    def __len__(self) -> int:
+        return sum(self.depth(name) for name in PRIORITY_CLASSES)
+
+    def depth(self, priority: str) -> int:
+        return sum(len(waiters) for waiters in self._waiting[priority].values())
+
+    def ahead_of(self, priority: str) -> float:
+        """
+        Roughly how many queued calls a new call in `priority` would wait behind:
+        its own class in full, other classes scaled by their share relative to it.
+        """
+        return sum(
+            self.depth(name) * min(1.0, self.shares[name] / self.shares[priority])
+            for name in PRIORITY_CLASSES
+        )
+
+    def push(self, priority: str, user: str, waiter: asyncio.Future) -> None:
+        users = self._waiting[priority]
+        if not users:
+            # A class returning from idle starts level with the busiest class instead of cashing in saved-up credit
+            active = [self._pass[name] for name in PRIORITY_CLASSES if self._waiting[name]]
+            if active:
+                self._pass[priority] = max(self._pass[priority], min(active))
+        users.setdefault(user, deque()).append((waiter, time.monotonic()))
+
+    def peek(self) -> asyncio.Future | None:
+        """The waiter pop() would return next, left in the queue (cancelled waiters ahead of it are dropped)."""
+        while True:
+            candidates = [name for name in PRIORITY_CLASSES if self._waiting[name]]
+            if not candidates:
+                return None
+            priority = min(candidates, key=lambda name: self._pass[name] + 1.0 / self.shares[name])
+            users = self._waiting[priority]
+            user, waiters = next(iter(users.items()))
+            waiter, _ = waiters[0]
+            if not waiter.cancelled():
+                return waiter
+            waiters.popleft()
+            if not waiters:
+                del users[user]
+
+    def pop(self) -> asyncio.Future | None:
+        """Next live waiter in fair order, skipping ones whose caller has gone away."""
+        while True:
+            candidates = [name for name in PRIORITY_CLASSES if self._waiting[name]]
+            if not candidates:
+                return None
+            # Lowest pass after being served goes first, so higher shares win ties from a standing start
+            priority = min(candidates, key=lambda name: self._pass[name] + 1.0 / self.shares[name])
+            users = self._waiting[priority]
+            user, waiters = next(iter(users.items()))
+            waiter, enqueued_at = waiters.popleft()
+            # Rotate the user to the back of their class
+            del users[user]
+            if waiters:
+                users[user] = waiters
+            if waiter.cancelled():
+                continue
+            self._pass[priority] += 1.0 / self.shares[priority]
+            self._waits[priority].append(time.monotonic() - enqueued_at)
+            return waiter
+
+    def snapshot(self) -> dict:
+        def p90(values):
+            ordered = sorted(values)
+            return round(ordered[int(0.9 * (len(ordered) - 1))], 3) if ordered else None
+
+        return {
+            name: {
+                "queued": self.depth(name),
+                "queued_users": len(self._waiting[name]),
+                "share": self.shares[name],
+                "wait_p90_seconds": p90(self._waits[name]),
+            }
+            for name in PRIORITY_CLASSES
+        }
+
+
+class ProviderScheduler:
+    """
+    Admission for one provider: request and token buckets sized to the provider's
+    quotas, plus an AIMD concurrency limit.
+
+    The limit grows by 1/limit after every call that finishes under the target
+    latency, and halves on a 429 / quota error or shrinks when calls run slow;
+    calls cancelled before finishing (hedge losers) leave it alone. Each
+    provider has its own scheduler, so a backlog on one never blocks another.
+    Calls that can't start right away wait in a FairQueue keyed on the caller's
+    priority class and user (see llms.priority). A waiter is granted its
+    concurrency slot and its request/token budget together, in fair order, so
+    a provider that is rate-limited rather than concurrency-limited still
+    serves priority classes by share and no waiter holds a slot while waiting
+    for tokens.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.requests = TokenBucket(_quota(provider, "rpm"))
+        self.tokens = TokenBucket(_quota(provider, "tpm"))
+        self.max_concurrency = _quota(provider, "max_concurrency")
+        self.target_latency = _quota(provider, "target_latency")
+        self.limit = self.max_concurrency / 2
+        self.in_flight = 0
+        self.queue = FairQueue(priority_shares())
+        # Estimated tokens per queued waiter
+        self._wanted: Dict[asyncio.Future, int] = {}
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _capacity(self) -> int:
+        return max(MIN_CONCURRENCY, int(self.limit))
+
+    def _budget_wait(self, estimated_tokens: int) -> float:
+        return max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+
+    def _grant(self, estimated_tokens: int) -> None:
+        self.requests.take(1)
+        self.tokens.take(estimated_tokens)
+        self.in_flight += 1
+
+    def _dispatch(self) -> None:
+        """Hand free slots, with their request/token budget, to queued callers in fair order."""
+        while self.in_flight < self._capacity():
+            waiter = self.queue.peek()
+            if waiter is None:
+                return
+            wait = self._budget_wait(self._wanted[waiter])
+            if wait > 0:
+                # The next caller in line waits for the buckets to refill; nobody overtakes it
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                return
+            self.queue.pop()
+            self._grant(self._wanted.pop(waiter))
+            waiter.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    async def _enter(self, estimated_tokens: int) -> None:
+        if self.in_flight < self._capacity() and not len(self.queue) and not self._budget_wait(estimated_tokens):
+            self._grant(estimated_tokens)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.queue.push(current_priority(), current_user(), waiter)
+        self._wanted[waiter] = estimated_tokens
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            self._wanted.pop(waiter, None)
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we were cancelled: pass it on
+                self.in_flight -= 1
+            # Either way the next caller in line may now be able to start
+            self._dispatch()
+            raise
+
+    def _exit(self, latency: float, throttled: bool, cancelled: bool = False) -> None:
+        self.in_flight -= 1
+        if cancelled:
+            # A hedge loser or abandoned call says nothing about the provider's capacity
+            pass
+        elif throttled:
+            self.limit = max(MIN_CONCURRENCY, self.limit / 2)
+            logging.warning(f"[scheduler] {self.provider} throttled, concurrency limit -> {self.limit:.1f}")
+        elif latency > self.target_latency:
+            self.limit = max(MIN_CONCURRENCY, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int):
+        """
+        Hold one concurrency slot plus request/token budget for the duration of a call.
+
+        The yielded dict lets the caller flag the call as throttled (429) so the
+        limit backs off multiplicatively.
+        """
+        await self._enter(estimated_tokens)
+        outcome = {"throttled": False}
+        started = time.monotonic()
+        cancelled = False
+        try:
+            yield outcome
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # Synchronous, so a cancelled (e.g. hedged-out) call still gives its slot back
+            self._exit(time.monotonic() - started, outcome["throttled"], cancelled)
+
+    def estimated_wait(self, priority: str) -> float:
+        """
+        Rough seconds a new call in `priority` would wait for a slot, from queue
+        depth and median call latency, or from the request rate when that binds.
+        """
+        ahead = self.queue.ahead_of(priority)
+        capacity = self._capacity()
+        if not ahead and self.in_flight < capacity:
+            return self.requests.wait_time(1)
+        service_time = get_stats(self.provider).latency_percentile(0.5) or self.target_latency / 2
+        return max((ahead + 1) * service_time / capacity, self.requests.wait_time(ahead + 1))
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "concurrency_limit": round(self.limit, 2),
+            "request_tokens": round(self.requests.tokens, 1),
+            "tpm_tokens": round(self.tokens.tokens, 1),
+            "queue": self.queue.snapshot(),
+        }
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+
+
+def get_scheduler(provider: str | None) -> ProviderScheduler:
+    """Return the shared scheduler for a provider (or the default pool when unnamed)."""
+    provider = provider or "default"
+    if provider not in _schedulers:
+        _schedulers[provider] = ProviderScheduler(provider)
+    return _schedulers[provider]
+
+
+def all_schedulers() -> Dict[str, ProviderScheduler]:
+    return dict(_schedulers)
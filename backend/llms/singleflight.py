@@ -0,0 +1,51 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+from llms.deadline import within_deadline
+from llms.priority import current_priority
+from utils.logger import logging
+
+_in_flight: Dict[str, asyncio.Task] = {}
+
+
+def coalesce_key(task: str, input_data: Dict[str, Any]) -> str:
+    """
+    Stable key for (task, input) in the caller's priority class: key order and
+    whitespace in the JSON don't matter. The work runs at its first caller's
+    priority, so callers in different classes never share a flight (an
+    interactive request must not wait behind background pre-generation).
+    """
+    canonical = json.dumps(input_data, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{task}:{current_priority()}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+
+async def do(key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run `work` once per key at a time.
+
+    The first caller for a key starts the work as a task; concurrent callers
+    with the same key await that task instead of starting their own. The entry
+    is dropped as soon as the work finishes, so later calls run fresh. Every
+    caller awaits through a shield, so one caller disconnecting does not cancel
+    the work the others are waiting on, and each caller stops waiting at its
+    own request deadline.
+    """
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(work())
+        _in_flight[key] = task
+        task.add_done_callback(lambda done: _forget(key, done))
+    else:
+        logging.info(f"[singleflight] joining in-flight call {key[:24]}")
+    async with within_deadline():
+        return await asyncio.shield(task)
+
+
+def _forget(key: str, task: asyncio.Task) -> None:
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+    # Mark the exception as retrieved even if every caller went away
+    if not task.cancelled():
+        task.exception()
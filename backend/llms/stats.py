@@ -0,0 +1,50 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class ProviderStats:
+    """
+    Rolling window of call outcomes for a single LLM provider.
+
+    Each entry is (timestamp, latency_seconds, succeeded). Only the last
+    `window` calls are kept so the numbers track the provider's current health.
+    """
+
+    def __init__(self, window: int = 50):
+        self._calls: Deque[Tuple[float, float, bool]] = deque(maxlen=window)
+
+    def record(self, latency: float, succeeded: bool) -> None:
+        self._calls.append((time.monotonic(), latency, succeeded))
+
+    def recent(self, since: float) -> List[Tuple[float, float, bool]]:
+        """Calls recorded at or after the monotonic timestamp `since`."""
+        return [call for call in self._calls if call[0] >= since]
+
+    def latency_percentile(self, q: float, since: float = 0.0) -> Optional[float]:
+        """Latency at quantile q (0-1) over successful calls, or None without history."""
+        latencies = sorted(lat for _, lat, ok in self.recent(since) if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(q * len(latencies)))
+        return latencies[index]
+
+    def snapshot(self) -> dict:
+        total = len(self._calls)
+        failures = sum(1 for _, _, ok in self._calls if not ok)
+        return {
+            "calls": total,
+            "error_rate": failures / total if total else 0.0,
+            "p50": self.latency_percentile(0.5),
+            "p90": self.latency_percentile(0.9),
+        }
+
+
+_stats: Dict[str, ProviderStats] = {}
+
+
+def get_stats(provider: str) -> ProviderStats:
+    """Return the shared stats object for a provider, creating it on first use."""
+    if provider not in _stats:
+        _stats[provider] = ProviderStats()
+    return _stats[provider]
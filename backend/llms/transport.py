@@ -0,0 +1,157 @@
+"""
+Shared HTTP transport for the LLM clients, kept warm between calls.
+
+Groq and xAI clients all get one httpx.AsyncClient instead of building their
+own, so connections (DNS, TCP, TLS) are pooled and reused across providers
+and requests. The pool is sized to the scheduler concurrency of every model
+route on those providers (each route has its own scheduler), and
+HTTP/2 is used unless LLM_HTTP2=false. Gemini talks
+gRPC over a single persistent HTTP/2 channel that its client already reuses,
+so it only takes part in the warm-up.
+
+While the app runs, a warm-up loop touches every provider every
+LLM_WARMUP_INTERVAL_SECONDS (shorter than the keep-alive expiry) so the first
+call after an idle period doesn't pay for a fresh connection.
+"""
+import asyncio
+import os
+import time
+from typing import Any, List, Optional, Tuple
+
+import httpx
+from google.ai.generativelanguage_v1beta import CountTokensRequest, Content, Part
+
+from llms.routing import all_routes
+from llms.scheduler import max_concurrency
+from utils.logger import logging
+
+# h2 comes with httpx[http2]; an install without it stays on HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Providers served through the shared httpx client, and where their warm-up requests go
+HTTP_PROVIDERS = {"groq": "https://api.groq.com", "grok": "https://api.x.ai"}
+
+HTTP2_ENABLED = os.getenv("LLM_HTTP2", "true").lower() == "true" and HTTP2_AVAILABLE
+KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "90"))
+CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+# Per-request timeouts are enforced by the call wrapper; this only stops a stuck read
+READ_TIMEOUT = float(os.getenv("LLM_HTTP_READ_TIMEOUT_SECONDS", "120"))
+WARMUP_INTERVAL_SECONDS = float(os.getenv("LLM_WARMUP_INTERVAL_SECONDS", "45"))
+WARMUP_TIMEOUT = 10.0
+
+_client: Optional[httpx.AsyncClient] = None
+_transport: Optional[httpx.AsyncHTTPTransport] = None
+_warmup_task: Optional[asyncio.Task] = None
+_stats = {"requests": 0, "errors": 0, "warmups": 0, "warmup_failures": 0, "last_warmup": None}
+
+
+def pool_limits() -> httpx.Limits:
+    """
+    Room for every model route on an HTTP provider running at its scheduler's
+    max concurrency, plus one spare connection per provider for warm-up;
+    override with LLM_HTTP_MAX_CONNECTIONS.
+    """
+    routes = [route for route in all_routes() if route.partition(":")[0] in HTTP_PROVIDERS]
+    default = sum(max_concurrency(route) for route in routes) + len(HTTP_PROVIDERS)
+    connections = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", default))
+    return httpx.Limits(
+        max_connections=connections,
+        max_keepalive_connections=connections,
+        keepalive_expiry=KEEPALIVE_SECONDS,
+    )
+
+
+async def _on_response(response: httpx.Response) -> None:
+    _stats["requests"] += 1
+    if response.status_code >= 500:
+        _stats["errors"] += 1
+
+
+def shared_async_client() -> httpx.AsyncClient:
+    """The process-wide async client handed to every httpx-based LLM client."""
+    global _client, _transport
+    if _client is None:
+        limits = pool_limits()
+        _transport = httpx.AsyncHTTPTransport(limits=limits, http2=HTTP2_ENABLED)
+        _client = httpx.AsyncClient(
+            transport=_transport,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            event_hooks={"response": [_on_response]},
+        )
+        logging.info(f"Shared LLM HTTP client: {limits.max_connections} connections, HTTP/2 {'on' if HTTP2_ENABLED else 'off'}")
+    return _client
+
+
+def pool_stats() -> dict:
+    """Connection pool state for /metrics/llm: open, idle and HTTP/2 connections plus request counters."""
+    stats = {
+        **_stats,
+        "http2": HTTP2_ENABLED,
+        "max_connections": pool_limits().max_connections,
+        "connections": 0,
+        "idle": 0,
+        "http2_connections": 0,
+    }
+    # httpcore keeps its connections on the transport's pool; read it best-effort
+    for connection in getattr(getattr(_transport, "_pool", None), "connections", []):
+        stats["connections"] += 1
+        stats["idle"] += connection.is_idle()
+        stats["http2_connections"] += "HTTP/2" in connection.info()
+    return stats
+
+
+async def _warm(provider: str, model: Any) -> None:
+    if provider in HTTP_PROVIDERS:
+        # Any response will do: the point is an open, TLS-established connection in the pool
+        await shared_async_client().head(HTTP_PROVIDERS[provider])
+    elif provider == "gemini":
+        await model.async_client.count_tokens(
+            request=CountTokensRequest(model=model.model, contents=[Content(role="user", parts=[Part(text="ping")])]),
+            retry=None,
+        )
+
+
+async def warm_up(providers: List[Tuple[str, Any]]) -> None:
+    """Open (or refresh) a connection to every provider; costs no tokens."""
+    # Model routes on an HTTP provider share the pooled connections, so one warm-up each
+    # is enough; every Gemini model client has its own channel
+    targets = {}
+    for name, model in providers:
+        provider = name.partition(":")[0]
+        targets.setdefault(provider if provider in HTTP_PROVIDERS else name, (provider, model))
+    results = await asyncio.gather(
+        *(asyncio.wait_for(_warm(provider, model), timeout=WARMUP_TIMEOUT) for provider, model in targets.values()),
+        return_exceptions=True,
+    )
+    for name, result in zip(targets, results):
+        if isinstance(result, Exception):
+            _stats["warmup_failures"] += 1
+            logging.warning(f"LLM connection warm-up for {name} failed: {result!r}")
+    _stats["warmups"] += 1
+    _stats["last_warmup"] = time.time()
+
+
+async def _warmup_loop(providers: List[Tuple[str, Any]]) -> None:
+    while True:
+        await warm_up(providers)
+        await asyncio.sleep(WARMUP_INTERVAL_SECONDS)
+
+
+def start_warmup(providers: List[Tuple[str, Any]]) -> None:
+    global _warmup_task
+    if WARMUP_INTERVAL_SECONDS > 0 and _warmup_task is None:
+        _warmup_task = asyncio.create_task(_warmup_loop(providers))
+
+
+async def stop_warmup() -> None:
+    global _warmup_task
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+        await asyncio.gather(_warmup_task, return_exceptions=True)
+        _warmup_task = None
+    if _client is not None:
+        await _client.aclose()
@@ -1,5 +1,8 @@
 import asyncio
-from typing import Any, Dict
+import json
+import time
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, Optional
 
 from langchain_core.runnables import Runnable
 from tenacity import (
@@ -9,15 +12,42 @@ from tenacity import (
     wait_exponential,
 )
 
+from llms import routing
+from llms.circuit_breaker import get_breaker
+from llms.deadline import (
+    CALL_TIMEOUT,
+    MIN_ATTEMPT_SECONDS,
+    STREAM_CHUNK_TIMEOUT,
+    STREAM_FIRST_CHUNK_TIMEOUT,
+    DeadlineExceeded,
+    attempt_timeout,
+    remaining,
+    within_deadline,
+)
+from llms.scheduler import get_scheduler
+from llms.stats import get_stats
+
 
-def _is_retryable(exc: Exception) -> bool:
+def _is_retryable(exc: BaseException) -> bool:
     """Retry only on transient errors; immediately give up on rate-limits (429)."""
+    # Cancellation (hedged-out call) and an expired request budget must propagate, not be retried
+    if isinstance(exc, (asyncio.CancelledError, DeadlineExceeded)):
+        return False
     msg = str(exc).lower()
     return not any(kw in msg for kw in ("429", "quota", "rate limit", "resource exhausted"))
 
 
+def _out_of_time(retry_state) -> bool:
+    """Stop retrying when the request's remaining budget can't cover the back-off plus a useful attempt."""
+    left = remaining()
+    if left is None:
+        return False
+    upcoming_wait = retry_state.upcoming_sleep or 0
+    return left - upcoming_wait < MIN_ATTEMPT_SECONDS
+
+
 @retry(
-    stop=stop_after_attempt(3),
+    stop=stop_after_attempt(3) | _out_of_time,
     wait=wait_exponential(multiplier=1, min=3, max=8),
     retry=retry_if_exception(_is_retryable),
     reraise=True,           # surface the real exception after all retries fail
@@ -25,25 +55,120 @@ def _is_retryable(exc: Exception) -> bool:
 async def _safe_call(chain: Runnable, input_data: dict) -> Any:
     """
     Invoke a LangChain chain with automatic retries (3 attempts,
-    exponential back-off .
+    exponential back-off), each attempt capped at CALL_TIMEOUT and at the
+    request's remaining budget. When the budget was the tighter limit, its
+    expiry raises DeadlineExceeded rather than counting as a provider timeout.
     """
-    return await chain.ainvoke(input_data)
+    timeout = attempt_timeout()
+    try:
+        return await asyncio.wait_for(chain.ainvoke(input_data), timeout=timeout)
+    except TimeoutError:
+        if timeout < CALL_TIMEOUT:
+            raise DeadlineExceeded("Request deadline exceeded")
+        raise
+
+
+def _record(provider: Optional[str], started: float, succeeded: bool) -> None:
+    """Feed the call outcome into the provider's rolling stats, circuit breaker and per-task route stats."""
+    if not provider:
+        return
+    latency = time.monotonic() - started
+    get_stats(provider).record(latency, succeeded=succeeded)
+    get_breaker(provider).evaluate()
+    routing.record(provider, latency, succeeded)
+
+
+# Rough allowance for the prompt template and the completion, on top of the input
+PROMPT_OVERHEAD_TOKENS = 1500
 
 
-# One semaphore for the whole process — limits concurrent LLM calls to 5
-_semaphore = asyncio.Semaphore(5)
+def _estimate_tokens(input_data: Dict[str, Any]) -> int:
+    """Cheap token estimate (~4 chars per token) used to charge the provider's TPM bucket."""
+    return len(json.dumps(input_data, default=str)) // 4 + PROMPT_OVERHEAD_TOKENS
 
 
-async def protected_invoke(chain: Runnable, input_data: Dict[str, Any]) -> Any | None:
+async def protected_invoke(
+    chain: Runnable,
+    input_data: Dict[str, Any],
+    provider: Optional[str] = None,
+) -> Any | None:
     """
     Rate-limited, retry-wrapped chain invocation.
 
+    Calls are admitted by the provider's own scheduler (request/token buckets
+    and an adaptive concurrency limit), so one slow provider does not hold up
+    the others. When `provider` is given, the call's latency and outcome are
+    also recorded in that provider's rolling stats (used for hedging and
+    circuit breaking).
+
+    The whole call, including the wait for a scheduler slot, is bounded by
+    the request deadline (see llms.deadline).
+
     Returns the parsed output on success, or None if every retry fails.
+    Raises DeadlineExceeded when the request's budget runs out.
+    """
+    async with within_deadline():
+        async with get_scheduler(provider).slot(_estimate_tokens(input_data)) as outcome:
+            started = time.monotonic()
+            try:
+                result = await _safe_call(chain, input_data)
+            except asyncio.CancelledError:
+                # Lost a hedge race (or the request went away): counts against this route
+                # in the task's routing stats only, not its health
+                routing.record(provider, time.monotonic() - started, succeeded=False)
+                raise
+            except DeadlineExceeded:
+                # The client's budget ran out, not the provider: leave its stats and breaker alone
+                raise
+            except Exception as exc:
+                outcome["throttled"] = not _is_retryable(exc)
+                _record(provider, started, succeeded=False)
+                print(f"[protected_invoke] All retries exhausted: {exc}")
+                return None
+            _record(provider, started, succeeded=result is not None)
+            return result
+
+
+async def protected_stream(
+    chain: Runnable,
+    input_data: Dict[str, Any],
+    provider: Optional[str] = None,
+) -> AsyncIterator[Any]:
+    """
+    Streaming counterpart of protected_invoke.
+
+    Holds a scheduler slot for the whole stream and records the outcome in the
+    provider's stats. The wait for a slot is bounded by the request deadline,
+    and each chunk by STREAM_FIRST_CHUNK_TIMEOUT (the first) or
+    STREAM_CHUNK_TIMEOUT (later ones), shrunk to the time left. Partial output
+    cannot be retried, so errors are re-raised for the caller to decide
+    whether to fall back to another provider.
     """
-    async with _semaphore:
-        await asyncio.sleep(0.1)   # tiny jitter to smooth out burst requests
+    async with AsyncExitStack() as stack:
+        # Only the slot wait runs under within_deadline: its timeout can't span the yields below
+        async with within_deadline():
+            outcome = await stack.enter_async_context(get_scheduler(provider).slot(_estimate_tokens(input_data)))
+        started = time.monotonic()
+        chunks = chain.astream(input_data)
+        stack.push_async_callback(chunks.aclose)
+        cap = STREAM_FIRST_CHUNK_TIMEOUT
         try:
-            return await _safe_call(chain, input_data)
+            while True:
+                timeout = attempt_timeout(cap)
+                try:
+                    chunk = await asyncio.wait_for(anext(chunks), timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                except TimeoutError:
+                    if timeout < cap:
+                        raise DeadlineExceeded("Request deadline exceeded")
+                    raise TimeoutError(f"No stream output from {provider} within {cap}s")
+                cap = STREAM_CHUNK_TIMEOUT
+                yield chunk
+        except DeadlineExceeded:
+            raise
         except Exception as exc:
-            print(f"[protected_invoke] All retries exhausted: {exc}")
-            return None
+            outcome["throttled"] = not _is_retryable(exc)
+            _record(provider, started, succeeded=False)
+            raise
+        _record(provider, started, succeeded=True)
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI,Request
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -17,8 +18,27 @@ from routers.main_router import router as main_router
 from routers.auth import auth_router
 from routers.mock import mock_router
 from routers.dashboard import dashboard_router
+from routers.jobs import jobs_router
+from routers.metrics import metrics_router
+from utils.jobs import start_workers, stop_workers
+from utils.main_utils import llms
+from utils.uploads import UploadSizeLimitMiddleware
+from llms.transport import start_warmup, stop_warmup
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Job queue workers run in every server process alongside the API
+    await start_workers()
+    # Keep provider connections open so the first LLM call after idle skips DNS/TLS setup
+    start_warmup(llms)
+    yield
+    # Running jobs may still be using the shared LLM HTTP client, so they stop first
+    await stop_workers()
+    await stop_warmup()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 # Use the shared limiter so app.state.limiter and all @limiter.limit()
@@ -41,11 +61,16 @@ app.add_middleware(
     
 )
 
+# Enforce the resume upload size limit while the body is received, before FastAPI spools it
+app.add_middleware(UploadSizeLimitMiddleware)
+
 app.include_router(bot_router)
 app.include_router(main_router)
 app.include_router(auth_router)
 app.include_router(mock_router)
 app.include_router(dashboard_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 @limiter.limit("10/minute")
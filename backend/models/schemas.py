@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field 
-from typing import List, Dict,Annotated, Optional
+from typing import List, Dict,Annotated, Optional, Literal
 from datetime import datetime
 
 class WorkExperience(BaseModel):
@@ -22,6 +22,22 @@ class ParsedResume(BaseModel):
     required_roles: Annotated[List[str], ...] = []
     work_experiences: Annotated[List[WorkExperience], ...] = []
 
+# Section-level parse targets, used when a resume is parsed one section at a time
+class ResumeProfileSection(BaseModel):
+    name: str = "Unknown"
+    skills: List[str] = []
+    required_roles: List[str] = []
+
+class ResumeExperienceSection(BaseModel):
+    experience: Optional[int] = None
+    work_experiences: List[WorkExperience] = []
+
+class ResumeEducationSection(BaseModel):
+    education: List[str] = []
+
+class ResumeProjectsSection(BaseModel):
+    projects: List[Project] = []
+
 class ParsedResumeDB(ParsedResume):
     username: Annotated[str, ...]
     user_id: Annotated[str, ...]
@@ -31,11 +47,19 @@ class ResumeStatus(BaseModel):
     synced: bool
     updated_at: Optional[datetime] = None
 
+# Set by the model; only questions that don't depend on the candidate's resume go into
+# the question bank (utils.question_bank). Internal, so never serialized to clients.
+RESUME_SPECIFIC_DESCRIPTION = (
+    "true if the question refers to the candidate's own projects, employers or experience; "
+    "false if any candidate for this role could be asked it"
+)
+
 class SingleQues(BaseModel):
     question: str
     options: List[str]
     correct_option: int
     explanation: str
+    resume_specific: bool = Field(default=True, exclude=True, description=RESUME_SPECIFIC_DESCRIPTION)
 
 class QuestionListResponse(BaseModel):
     questions: List[SingleQues]
@@ -72,6 +96,7 @@ class BotModel(BaseModel):
 class MockQuestion(BaseModel):
     question: str
     expected_answer: str
+    resume_specific: bool = Field(default=True, exclude=True, description=RESUME_SPECIFIC_DESCRIPTION)
 
 class MockResponse(BaseModel):
     questions: List[MockQuestion]
@@ -93,6 +118,26 @@ class RatingResponse(BaseModel):
     better_answer: Annotated[str, Field(description="Suggested better answer user could give as per user answer,expected answer and question")]
     feedback: Annotated[str, Field(description="Suggested feedback for user,key areas of improvements and suggestions and point out mistakes")]
 
+class RatingBatchRequest(BaseModel):
+    items: Annotated[List[RatingRequest], Field(min_length=1, max_length=50)]
+
+class RatingBatchResponse(BaseModel):
+    ratings: List[RatingResponse]
+
+class RatingStatusResponse(BaseModel):
+    rating_id: str
+    status: Literal["pending", "ready", "failed"]
+    result: Optional[RatingResponse] = None
+
+class ProvisionalRatingResponse(RatingStatusResponse):
+    provisional_rating: Annotated[float, Field(ge=0, le=5, description="Instant estimate from embedding similarity and keyword coverage")]
+
+class IndexedRating(RatingResponse):
+    index: Annotated[int, Field(description="index of the answer this rating is for")]
+
+class IndexedRatingList(BaseModel):
+    ratings: List[IndexedRating]
+
 # Dashboard Models
 class QuestionData(BaseModel):
     question: str
@@ -121,3 +166,13 @@ class DashboardStats(BaseModel):
     overall_average_rating: float
     best_performance: Optional[Dict] = None
     recent_test_date: Optional[datetime] = None
+
+# Job queue models
+class JobResponse(BaseModel):
+    job_id: str
+    type: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
@@ -12,6 +12,7 @@ import os
 import sys
 from passlib.context import CryptContext
 from limiter import limiter
+from llms.priority import set_llm_user
 
 # JWT config
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -68,6 +69,8 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Tok
         if not user_db:
             raise credentials_exception
 
+        # LLM calls made while serving this request are fair-queued per user
+        set_llm_user(user_id)
         return TokenData(username=username, user_id=user_id)
 
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError, jwt.DecodeError, jwt.InvalidSignatureError) as e:
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from utils.main_utils import get_bot_ans
 from models.schemas import BotModel
 from utils.logger import logging
 from limiter import limiter
+from llms.deadline import request_budget
+from utils.admission import admission_control
 
 bot_router = APIRouter()
 
-@bot_router.get("/bot", response_model=BotModel)
+@bot_router.get("/bot", response_model=BotModel, dependencies=[Depends(request_budget("bot")), Depends(admission_control("bot"))])
 @limiter.limit("10/minute")
 async def hello(request: Request, query: str):
     logging.info(f"User query: {query}")
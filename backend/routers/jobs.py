@@ -0,0 +1,224 @@
+# Jobs Router - queue slow LLM operations and poll for their results (AUTH PROTECTED)
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Request, UploadFile
+from typing import Annotated, Optional
+import sys
+
+from models.schemas import (
+    ParsedResume, ParsedResumeDB, QuestionRequest, MockQuestionRequest, RatingRequest, JobResponse,
+)
+from models.auth import TokenData
+from connections.mongo_client import MongoDBClient
+from routers.auth import get_current_user
+from routers.main_router import save_resume_to_db
+from utils.uploads import read_resume_upload
+from utils.jobs import register_handler, enqueue_job, get_job, JobFailed
+from utils.main_utils import parse_resume, get_questions_from_resume, get_mock_questions, get_mock_rating, resume_cache, resume_cache_key
+from utils.pregeneration import pregenerate_questions, take_pregenerated, remember_params
+from utils.exception import MyException
+from utils.logger import logging
+from limiter import limiter
+
+jobs_router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"]
+)
+
+client = MongoDBClient()
+
+
+# ---------------------------
+# JOB HANDLERS (run by the queue workers)
+# ---------------------------
+async def _load_resume(user_id: str) -> dict:
+    resume_data = await client.find_one("Resume", {"user_id": user_id})
+    if not resume_data:
+        raise JobFailed("No resume found, upload a resume first")
+    return ParsedResume(**resume_data).model_dump()
+
+
+async def _parse_resume_job(payload: dict, user_id: str) -> dict:
+    contents = payload["contents"]
+    cache_key = resume_cache_key(contents)
+    extracted_info = await resume_cache.get(cache_key)
+    cache_hit = extracted_info is not None
+    if not cache_hit:
+        try:
+            result = await parse_resume(contents, payload["file_type"])
+        except HTTPException as e:
+            # Unreadable or unsupported file: retrying won't help
+            raise JobFailed(str(e.detail))
+        if result is None:
+            raise RuntimeError("Resume parsing returned no result")
+        extracted_info = result.model_dump()
+
+    parsed = ParsedResume(**extracted_info)
+    if not cache_hit:
+        # Cached only once it has validated, so a bad parse isn't served to every re-upload
+        await resume_cache.set(cache_key, parsed.model_dump())
+    await save_resume_to_db(ParsedResumeDB(**extracted_info, username=payload["username"], user_id=user_id), user_id)
+    await enqueue_job("pregenerate_questions", user_id, {"resume": parsed.model_dump()})
+    return parsed.model_dump()
+
+
+async def _save_resume_job(payload: dict, user_id: str) -> None:
+    await save_resume_to_db(ParsedResumeDB(**payload["resume"]), user_id)
+
+
+async def _pregenerate_job(payload: dict, user_id: str) -> None:
+    await pregenerate_questions(user_id, payload["resume"])
+
+
+def _question_job(task: str, generate):
+    async def handler(payload: dict, user_id: str) -> dict:
+        input_data = {**payload, "resume_text": await _load_resume(user_id)}
+        result = await take_pregenerated(user_id, task, input_data)
+        if result is None:
+            result = await generate(input_data, user_id)
+            if result is None:
+                raise RuntimeError("Question generation returned no result")
+            result = result.model_dump()
+        return result
+    return handler
+
+
+async def _rating_job(payload: dict, user_id: str) -> dict:
+    result = await get_mock_rating(payload)
+    if result is None:
+        raise RuntimeError("Rating returned no result")
+    return result.model_dump()
+
+
+register_handler("parse_resume", _parse_resume_job)
+register_handler("save_resume", _save_resume_job)
+register_handler("pregenerate_questions", _pregenerate_job)
+register_handler("questions", _question_job("questions", get_questions_from_resume))
+register_handler("mock_questions", _question_job("mock_questions", get_mock_questions))
+register_handler("rating", _rating_job)
+
+
+def _job_response(job: dict) -> JobResponse:
+    return JobResponse(job_id=job["_id"], **{name: job.get(name) for name in ("type", "status", "attempts", "error", "created_at", "updated_at")})
+
+
+async def _submit(job_type: str, user_id: str, payload: dict, idempotency_key: Optional[str]) -> JobResponse:
+    try:
+        job = await enqueue_job(job_type, user_id, payload, idempotency_key=idempotency_key)
+    except Exception as e:
+        raise MyException(e, sys)
+    return _job_response(job)
+
+
+# ---------------------------
+# SUBMIT JOBS
+# ---------------------------
+@jobs_router.post("/upload_resume", response_model=JobResponse, status_code=202)
+@limiter.limit("5/minute")
+async def submit_upload_resume(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)],
+    file: UploadFile = File(...),
+    idempotency_key: Annotated[Optional[str], Header()] = None
+):
+    """Queued variant of /upload_resume: the file is validated now, parsed and saved by a worker."""
+    contents, file_type = await read_resume_upload(file)
+
+    payload = {"contents": contents, "file_type": file_type, "username": token_data.username}
+    return await _submit("parse_resume", token_data.user_id, payload, idempotency_key)
+
+
+@jobs_router.post("/get_questions", response_model=JobResponse, status_code=202)
+@limiter.limit("5/minute")
+async def submit_get_questions(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)],
+    question_query: QuestionRequest,
+    idempotency_key: Annotated[Optional[str], Header()] = None
+):
+    """Queued variant of /get_questions."""
+    await remember_params(token_data.user_id, "questions", question_query.model_dump())
+    return await _submit("questions", token_data.user_id, question_query.model_dump(), idempotency_key)
+
+
+@jobs_router.post("/mock/get_questions", response_model=JobResponse, status_code=202)
+@limiter.limit("5/minute")
+async def submit_mock_questions(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)],
+    question_query: MockQuestionRequest,
+    idempotency_key: Annotated[Optional[str], Header()] = None
+):
+    """Queued variant of /mock/get_questions."""
+    await remember_params(token_data.user_id, "mock_questions", question_query.model_dump())
+    return await _submit("mock_questions", token_data.user_id, question_query.model_dump(), idempotency_key)
+
+
+@jobs_router.post("/mock/get_rating", response_model=JobResponse, status_code=202)
+@limiter.limit("5/minute")
+async def submit_mock_rating(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)],
+    rating_query: RatingRequest,
+    idempotency_key: Annotated[Optional[str], Header()] = None
+):
+    """Queued variant of /mock/get_rating."""
+    return await _submit("rating", token_data.user_id, rating_query.model_dump(), idempotency_key)
+
+
+# ---------------------------
+# JOB STATUS & RESULT
+# ---------------------------
+def _job_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail={
+            "error": "Job Not Found",
+            "message": "No such job for this user.",
+            "code": 4001
+        }
+    )
+
+
+@jobs_router.get("/{job_id}", response_model=JobResponse)
+@limiter.limit("60/minute")
+async def get_job_status(request: Request, job_id: str, token_data: Annotated[TokenData, Depends(get_current_user)]):
+    """Lightweight status endpoint for the client to poll, like /resume_status for any queued operation."""
+    try:
+        job = await get_job(job_id, token_data.user_id)
+    except Exception as e:
+        raise MyException(e, sys)
+    if not job:
+        raise _job_not_found()
+    return _job_response(job)
+
+
+@jobs_router.get("/{job_id}/result")
+@limiter.limit("60/minute")
+async def get_job_result(request: Request, job_id: str, token_data: Annotated[TokenData, Depends(get_current_user)]):
+    """The job's result once it has succeeded (same body as the synchronous endpoint); 409 while queued/running or after failure."""
+    try:
+        job = await get_job(job_id, token_data.user_id)
+    except Exception as e:
+        raise MyException(e, sys)
+    if not job:
+        raise _job_not_found()
+
+    if job["status"] == "failed":
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": "Job Failed",
+                "message": job.get("error") or "The job failed.",
+                "code": 4003
+            }
+        )
+    if job["status"] != "succeeded":
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": "Job Not Finished",
+                "message": f"Job is {job['status']}, poll /jobs/{job_id} until it has succeeded.",
+                "code": 4002
+            }
+        )
+    logging.info(f"Serving result of job {job_id} for user_id: {token_data.user_id}")
+    return job.get("result")
@@ -1,6 +1,13 @@
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, BackgroundTasks,Request
+from fastapi.responses import StreamingResponse
 from typing import Annotated, List
-from utils.main_utils import parse_resume , get_questions_from_resume 
+from utils.main_utils import parse_resume , get_questions_from_resume, stream_questions_from_resume, resume_cache, resume_cache_key
+from utils.sse import question_events, SSE_HEADERS
+from utils.pregeneration import take_pregenerated, remember_params
+from utils.jobs import enqueue_job
+from llms.deadline import request_budget
+from utils.admission import admission_control
+from utils.uploads import read_resume_upload
 from models.schemas import ParsedResume, ParsedResumeDB, QuestionRequest, QuestionListResponse, ResumeStatus
 from utils.exception import MyException
 from utils.logger import logging
@@ -44,7 +51,7 @@ async def save_resume_to_db(db_resume_data: ParsedResumeDB, user_id: str):
         raise MyException(e, sys)
 
 
-@router.post("/upload_resume", response_model=ParsedResume)
+@router.post("/upload_resume", response_model=ParsedResume, dependencies=[Depends(request_budget("upload_resume"))])
 @limiter.limit("5/minute")
 async def upload_resume(
     token_data: Annotated[TokenData, Depends(get_current_user)],
@@ -54,43 +61,26 @@ async def upload_resume(
 ):
     """Upload and parse resume with file validation"""
 
-    # Validate file type
-    allowed_types = [
-        "application/pdf",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    ]
-    if file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": "Invalid File Type",
-                "message": "Only PDF and DOCX files are allowed.",
-                "code": 2001
-            }
-        )
-
-    # Validate file size (max 10MB)
-    contents = await file.read()
-    if len(contents) > 10 * 1024 * 1024:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": "File Too Large",
-                "message": "File size must not exceed 10MB.",
-                "code": 2002
-            }
-        )
-
-    # Reset file pointer so parse_resume can read from the beginning
-    await file.seek(0)
-
-    # Parse the resume (async — calls AI model)
-    try:
-        result = await parse_resume(file, ParsedResume)
-    except Exception as e:
-        raise MyException(e, sys)
+    # Oversized bodies were already cut off by UploadSizeLimitMiddleware; the type is
+    # sniffed from the first chunk's magic bytes rather than the client's content_type
+    contents, file_type = await read_resume_upload(file)
 
-    extracted_info = result.model_dump()
+    # Identical re-uploads are served from the content-addressed cache without an LLM call
+    cache_key = resume_cache_key(contents)
+    extracted_info = await resume_cache.get(cache_key)
+    cache_hit = extracted_info is not None
+    if cache_hit:
+        logging.info(f"Resume cache hit for user_id: {token_data.user_id}")
+    else:
+        # Parse the resume from the bytes already read (async — calls AI model)
+        try:
+            result = await parse_resume(contents, file_type)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise MyException(e, sys)
+
+        extracted_info = result.model_dump()
 
     # Build DB model and dispatch save as a background task
     db_resume_data = ParsedResumeDB(
@@ -98,10 +88,20 @@ async def upload_resume(
         username=token_data.username,
         user_id=token_data.user_id
     )
-    background_tasks.add_task(save_resume_to_db, db_resume_data, token_data.user_id)
+    # Save (and warm the question sets the user is about to ask for) on the durable
+    # job queue, so the write isn't lost if this worker restarts
+    parsed = ParsedResume(**extracted_info)
+    if not cache_hit:
+        # Cached only once it has validated, so a bad parse isn't served to every re-upload
+        background_tasks.add_task(resume_cache.set, cache_key, parsed.model_dump())
+    try:
+        await enqueue_job("save_resume", token_data.user_id, {"resume": db_resume_data.model_dump()})
+        await enqueue_job("pregenerate_questions", token_data.user_id, {"resume": parsed.model_dump()})
+    except Exception as e:
+        raise MyException(e, sys)
 
     # Return immediately without waiting for DB write
-    return ParsedResume(**extracted_info)
+    return parsed
 
 
 @router.get("/resume_status", response_model=ResumeStatus)
@@ -135,12 +135,13 @@ async def get_resume(request:Request,token_data:Annotated[TokenData, Depends(get
 
 
 
-@router.post("/get_questions",response_model=QuestionListResponse)
+@router.post("/get_questions",response_model=QuestionListResponse, dependencies=[Depends(request_budget("questions")), Depends(admission_control("questions"))])
 @limiter.limit("5/minute")
-async def get_questions(request:Request,token_data:Annotated[TokenData, Depends(get_current_user)] , question_query: QuestionRequest):
+async def get_questions(request:Request,token_data:Annotated[TokenData, Depends(get_current_user)] , question_query: QuestionRequest, background_tasks: BackgroundTasks):
     username = token_data.username
     user_id = token_data.user_id
     input_data = question_query.model_dump()
+    background_tasks.add_task(remember_params, user_id, "questions", question_query.model_dump())
     try:
         resume_data = await client.find_one("Resume", {"user_id": user_id})
     except Exception as e:
@@ -149,7 +150,11 @@ async def get_questions(request:Request,token_data:Annotated[TokenData, Depends(
     try:
         resume_text = ParsedResume(**resume_data)
         input_data["resume_text"] = resume_text.model_dump()
-        questions = await get_questions_from_resume(QuestionListResponse, input_data)
+        questions = await take_pregenerated(user_id, "questions", input_data)
+        if questions is None:
+            questions = await get_questions_from_resume(input_data, user_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise MyException(e, sys)
     
@@ -166,6 +171,28 @@ async def get_questions(request:Request,token_data:Annotated[TokenData, Depends(
 #  print(extracted_info)
     return extracted_info
 
+@router.post("/get_questions/stream", dependencies=[Depends(request_budget("questions_stream")), Depends(admission_control("questions"))])
+@limiter.limit("5/minute")
+async def stream_questions(request:Request,token_data:Annotated[TokenData, Depends(get_current_user)] , question_query: QuestionRequest, background_tasks: BackgroundTasks):
+    """
+    Server-sent events variant of /get_questions.
+    Emits one `question` event per SingleQues as soon as it is generated, then `done` (or `error`).
+    """
+    input_data = question_query.model_dump()
+    background_tasks.add_task(remember_params, token_data.user_id, "questions", question_query.model_dump())
+    try:
+        resume_data = await client.find_one("Resume", {"user_id": token_data.user_id})
+    except Exception as e:
+        raise MyException(e, sys)
+    input_data["resume_text"] = ParsedResume(**resume_data).model_dump()
+    pregenerated = await take_pregenerated(token_data.user_id, "questions", input_data)
+
+    events = question_events(
+        pregenerated, lambda: stream_questions_from_resume(input_data, token_data.user_id), token_data.user_id
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.post("/resume_data", response_model=ParsedResume)
 @limiter.limit("5/minute")
 async def post_resume_data(request:Request, resume_data: ParsedResume, token_data: Annotated[TokenData, Depends(get_current_user)]):
@@ -186,6 +213,10 @@ async def post_resume_data(request:Request, resume_data: ParsedResume, token_dat
             await client.insert_one("Resume", db_resume_data.model_dump())
         except Exception as e:
             raise MyException(e, sys)
-    
+
+    try:
+        await enqueue_job("pregenerate_questions", token_data.user_id, {"resume": resume_data.model_dump()})
+    except Exception:
+        logging.exception(f"Could not queue question pre-generation for user_id: {token_data.user_id}")
     return resume_data
 
@@ -0,0 +1,50 @@
+# Metrics Router - LLM provider health and scheduler queue depths (AUTH PROTECTED, no user data)
+from fastapi import APIRouter, Depends, Request
+from typing import Annotated
+
+from llms.circuit_breaker import get_breaker
+from llms.context_cache import all_context_caches
+from llms.scheduler import all_schedulers
+from llms import routing
+from llms.stats import get_stats
+from llms.transport import pool_stats
+from utils.main_utils import llms
+from utils import admission
+from limiter import limiter
+from routers.auth import get_current_user
+from models.auth import TokenData
+
+metrics_router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+@metrics_router.get("/llm")
+@limiter.limit("30/minute")
+async def llm_metrics(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)]
+):
+    """
+    Per-model-route rolling stats, breaker state, scheduler state (queue
+    depth and wait p90 per priority class) and context cache use, plus the
+    current route order per task group, the admission-control load signals
+    used for autoscaling and the shared HTTP connection pool.
+    """
+    schedulers = all_schedulers()
+    context_caches = all_context_caches()
+    return {
+        "providers": {
+            name: {
+                "stats": get_stats(name).snapshot(),
+                "breaker": get_breaker(name).snapshot(),
+                "scheduler": schedulers[name].snapshot() if name in schedulers else None,
+                "context_cache": context_caches[name].snapshot() if name in context_caches else None,
+            }
+            for name, _ in llms
+        },
+        "routing": routing.snapshot(),
+        "admission": admission.snapshot(),
+        "http_pool": pool_stats(),
+    }
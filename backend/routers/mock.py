@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from typing import Annotated, List
-from models.schemas import ParsedResume,MockQuestionRequest,MockResponse,RatingRequest,RatingResponse
+from models.schemas import ParsedResume,MockQuestionRequest,MockResponse,RatingRequest,RatingResponse,RatingBatchRequest,RatingBatchResponse,ProvisionalRatingResponse,RatingStatusResponse
 from utils.exception import MyException
 from utils.logger import logging
 import sys
 import json
 from connections.mongo_client import MongoDBClient
-from utils.main_utils import get_mock_questions, get_mock_rating
+from utils.main_utils import get_mock_questions, get_mock_rating, get_mock_ratings, get_provisional_rating, refine_rating, get_rating_status, stream_mock_questions, stream_mock_ratings
+from utils.sse import sse_event, question_events, SSE_HEADERS
+from utils.pregeneration import take_pregenerated, remember_params
+from llms.deadline import request_budget
+from utils.admission import admission_control
 from models.auth import TokenData
 from routers.auth import get_current_user
 from limiter import limiter
@@ -20,14 +25,16 @@ mock_router = APIRouter(
 )
 
 
-@mock_router.post("/get_questions", response_model=MockResponse)
+@mock_router.post("/get_questions", response_model=MockResponse, dependencies=[Depends(request_budget("mock_questions")), Depends(admission_control("mock_questions"))])
 @limiter.limit("5/minute")
 async def get_questions(
     request: Request,
     token_data: Annotated[TokenData, Depends(get_current_user)],
-    question_query: MockQuestionRequest
+    question_query: MockQuestionRequest,
+    background_tasks: BackgroundTasks
 ):
     user_id = token_data.user_id
+    background_tasks.add_task(remember_params, user_id, "mock_questions", question_query.model_dump())
     try:
         ResumeDB = await client.find_one("Resume", {"user_id": user_id})
     except Exception as e:
@@ -40,24 +47,134 @@ async def get_questions(
     input_data["resume_text"] = resume_text.model_dump()
 
     try:
-        questions = await get_mock_questions(
-            input_data,
-            parser=MockResponse
-        )
+        questions = await take_pregenerated(user_id, "mock_questions", input_data)
+        if questions is None:
+            questions = await get_mock_questions(input_data, user_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise MyException(e, sys)
 
     return questions
 
-@mock_router.post("/get_rating", response_model=RatingResponse)
+@mock_router.post("/get_questions/stream", dependencies=[Depends(request_budget("mock_questions_stream")), Depends(admission_control("mock_questions"))])
+@limiter.limit("5/minute")
+async def stream_questions(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)],
+    question_query: MockQuestionRequest,
+    background_tasks: BackgroundTasks
+):
+    """
+    Server-sent events variant of /mock/get_questions.
+    Emits one `question` event per MockQuestion as soon as it is generated, then `done` (or `error`).
+    """
+    user_id = token_data.user_id
+    background_tasks.add_task(remember_params, user_id, "mock_questions", question_query.model_dump())
+    try:
+        ResumeDB = await client.find_one("Resume", {"user_id": user_id})
+    except Exception as e:
+        raise MyException(e, sys)
+
+    input_data = question_query.model_dump()
+    input_data["resume_text"] = ParsedResume(**ResumeDB).model_dump()
+    pregenerated = await take_pregenerated(user_id, "mock_questions", input_data)
+
+    events = question_events(pregenerated, lambda: stream_mock_questions(input_data, user_id), user_id)
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+@mock_router.post("/get_rating", response_model=RatingResponse, dependencies=[Depends(request_budget("rating")), Depends(admission_control("rating"))])
 @limiter.limit("5/minute")
 async def get_rating(request: Request, token_data: Annotated[TokenData, Depends(get_current_user)], rating_query: RatingRequest):
 
     input_data = rating_query.model_dump()
    
     try:
-        rating = await get_mock_rating(input_data,parser=RatingResponse)
+        rating = await get_mock_rating(input_data)
+    except HTTPException:
+        raise
     except Exception as e:
         raise MyException(e,sys)
 
-    return rating
\ No newline at end of file
+    return rating
+
+
+@mock_router.post("/get_rating/provisional", response_model=ProvisionalRatingResponse)
+@limiter.limit("5/minute")
+async def get_provisional_rating_route(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)],
+    rating_query: RatingRequest
+):
+    """
+    Two-phase rating: returns an instant `provisional_rating` computed locally and
+    queues the full LLM rating as a job. Poll /mock/rating/{rating_id} until its
+    status is "ready" to get the feedback and better answer, or "failed".
+    """
+    input_data = rating_query.model_dump()
+    try:
+        provisional = await get_provisional_rating(input_data)
+        if provisional.status == "pending":
+            await refine_rating(input_data, token_data.user_id)
+    except Exception as e:
+        raise MyException(e, sys)
+    return provisional
+
+
+@mock_router.get("/rating/{rating_id}", response_model=RatingStatusResponse)
+@limiter.limit("60/minute")
+async def get_rating_result(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)],
+    rating_id: str
+):
+    """Status of a rating started by /mock/get_rating/provisional, with the LLM result once it is ready."""
+    try:
+        return await get_rating_status(rating_id, token_data.user_id)
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+@mock_router.post("/get_rating_batch", response_model=RatingBatchResponse, dependencies=[Depends(request_budget("rating_batch")), Depends(admission_control("rating_batch"))])
+@limiter.limit("5/minute")
+async def get_rating_batch(
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_current_user)],
+    rating_query: RatingBatchRequest,
+    stream: bool = False
+):
+    """
+    Rate every answer of a mock interview in one request.
+
+    With `?stream=true` the response is server-sent events instead: one `rating`
+    event per answer (with its `index` in the request) as soon as it is rated,
+    then `done` (or `error`).
+    """
+    items = [item.model_dump() for item in rating_query.items]
+
+    if stream:
+        async def event_stream():
+            count = 0
+            try:
+                async for index, rating in stream_mock_ratings(items):
+                    count += 1
+                    yield sse_event("rating", {"index": index, **rating.model_dump()})
+            except Exception:
+                logging.exception(f"Rating stream failed for user_id: {token_data.user_id}")
+                yield sse_event("error", {"message": "Rating failed", "count": count})
+                return
+            if count < len(items):
+                yield sse_event("error", {"message": f"Could not rate {len(items) - count} answers", "count": count})
+                return
+            yield sse_event("done", {"count": count})
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    try:
+        ratings = await get_mock_ratings(items)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise MyException(e, sys)
+
+    return RatingBatchResponse(ratings=ratings)
@@ -0,0 +1,102 @@
+"""
+Admission control (load shedding) for the LLM-backed endpoints.
+
+Each provider scheduler knows how many calls are queued per priority class,
+its current concurrency limit and the provider's median latency, which gives a
+rough estimate of how long a new call would wait for a slot. A request is
+hedged across the healthy providers, so it waits as long as the least loaded
+one. When that estimate would eat more than ADMISSION_BUDGET_FRACTION of the
+endpoint's deadline, the request could only end in a 504 after tying up a
+connection, so it is rejected up front with a 503 and a Retry-After telling
+the client when the queue should have drained enough. The same estimates are
+exposed on /metrics/llm as signals for autoscaling.
+"""
+import math
+import os
+from collections import Counter
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from llms.circuit_breaker import get_breaker
+from llms.deadline import endpoint_budget
+from llms.priority import PRIORITY_CLASSES
+from llms.routing import ordered_routes
+from llms.scheduler import all_schedulers
+from utils.logger import logging
+from utils.main_utils import llms, task_priority
+
+ADMISSION_ENABLED = os.getenv("LLM_ADMISSION_CONTROL", "true").lower() == "true"
+# Shed once the estimated queue wait exceeds this share of the endpoint budget,
+# leaving the rest for the call itself
+ADMISSION_BUDGET_FRACTION = float(os.getenv("LLM_ADMISSION_BUDGET_FRACTION", "0.5"))
+# Hard cap on calls queued per provider, whatever the estimate says
+MAX_QUEUE_DEPTH = int(os.getenv("LLM_MAX_QUEUE_DEPTH", "200"))
+
+_shed = Counter()
+
+
+def _routes(task: Optional[str]) -> List[str]:
+    return ordered_routes(task) if task else [name for name, _ in llms]
+
+
+def estimated_wait(priority: str, task: Optional[str] = None) -> float:
+    """Seconds a new call in `priority` would queue before one of the task's healthy model routes takes it (0 when idle)."""
+    schedulers = all_schedulers()
+    waits = [
+        schedulers[name].estimated_wait(priority) if name in schedulers else 0.0
+        for name in _routes(task)
+        if get_breaker(name).allow_request()
+    ]
+    # No healthy provider: the handler's own "unavailable" error covers it
+    return min(waits, default=0.0)
+
+
+def queued_calls(task: Optional[str] = None) -> int:
+    """Calls waiting for a slot on the task's least loaded model route."""
+    schedulers = all_schedulers()
+    return min(
+        (sum(schedulers[name].queue.depth(priority) for priority in PRIORITY_CLASSES) if name in schedulers else 0
+         for name in _routes(task)),
+        default=0,
+    )
+
+
+def _overloaded(name: str, retry_after: float) -> HTTPException:
+    _shed[name] += 1
+    return HTTPException(
+        status_code=503,
+        detail={
+            "error": "Service Overloaded",
+            "message": "The AI is busy right now, please try again shortly.",
+            "code": 5002
+        },
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def admission_control(name: str):
+    """FastAPI dependency that sheds the request with a 503 when its LLM work would not fit endpoint `name`'s budget."""
+    async def dependency() -> None:
+        if not ADMISSION_ENABLED:
+            return
+        allowed = endpoint_budget(name) * ADMISSION_BUDGET_FRACTION
+        wait = estimated_wait(task_priority(name), name)
+        if wait > allowed:
+            logging.warning(f"Shedding {name} request: estimated LLM queue wait {wait:.1f}s exceeds {allowed:.1f}s")
+            raise _overloaded(name, wait - allowed)
+        if queued_calls(name) >= MAX_QUEUE_DEPTH:
+            logging.warning(f"Shedding {name} request: LLM queue depth at {MAX_QUEUE_DEPTH}")
+            raise _overloaded(name, wait)
+    return dependency
+
+
+def snapshot() -> dict:
+    """Load signals for autoscaling: queued calls, estimated wait per priority class and requests shed per endpoint."""
+    return {
+        "enabled": ADMISSION_ENABLED,
+        "queued": queued_calls(),
+        "in_flight": sum(scheduler.in_flight for scheduler in all_schedulers().values()),
+        "estimated_wait_seconds": {priority: round(estimated_wait(priority), 2) for priority in PRIORITY_CLASSES},
+        "shed": dict(_shed),
+    }
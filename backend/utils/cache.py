@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from connections.mongo_client import MongoDBClient
+from utils.logger import logging
+
+
+class MongoLRUCache:
+    """
+    Two-level cache: a bounded in-process LRU in front of a Mongo collection.
+
+    Documents are stored as {"key": ..., "value": {...}, "created_at": ...}.
+    Lookups hit the LRU first, then Mongo (promoting the hit into the LRU).
+    Cache failures are logged and treated as misses so they never fail a request.
+
+    With `ttl_seconds`, entries expire that long after they were written: Mongo
+    drops them through a TTL index on created_at, and reads check the age too
+    since the TTL monitor only runs about once a minute.
+    """
+
+    def __init__(self, collection_name: str, maxsize: int = 256, ttl_seconds: Optional[float] = None):
+        self.collection_name = collection_name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lru: "OrderedDict[str, Tuple[dict, datetime]]" = OrderedDict()
+        self._client = MongoDBClient()
+        self._indexed = False
+
+    async def _ensure_index(self) -> None:
+        if not self._indexed:
+            collection = self._client.get_collection(self.collection_name)
+            await collection.create_index("key", unique=True)
+            if self.ttl_seconds:
+                await collection.create_index("created_at", expireAfterSeconds=int(self.ttl_seconds))
+            self._indexed = True
+
+    def _expired(self, created_at: datetime) -> bool:
+        if not self.ttl_seconds:
+            return False
+        if created_at.tzinfo is None:
+            # Motor returns naive UTC datetimes unless the client is tz_aware
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - created_at > timedelta(seconds=self.ttl_seconds)
+
+    def _remember(self, key: str, value: dict, created_at: datetime) -> None:
+        self._lru[key] = (value, created_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[dict]:
+        if key in self._lru:
+            value, created_at = self._lru[key]
+            if not self._expired(created_at):
+                self._lru.move_to_end(key)
+                return value
+            del self._lru[key]
+        try:
+            await self._ensure_index()
+            doc = await self._client.find_one(self.collection_name, {"key": key})
+        except Exception:
+            logging.exception(f"Cache lookup failed in {self.collection_name}")
+            return None
+        if not doc or self._expired(doc["created_at"]):
+            return None
+        self._remember(key, doc["value"], doc["created_at"])
+        return doc["value"]
+
+    async def set(self, key: str, value: dict) -> None:
+        created_at = datetime.now(timezone.utc)
+        self._remember(key, value, created_at)
+        try:
+            await self._ensure_index()
+            await self._client.update_one(
+                self.collection_name,
+                {"key": key},
+                {"key": key, "value": value, "created_at": created_at},
+                upsert=True,
+            )
+        except Exception:
+            logging.exception(f"Cache write failed in {self.collection_name}")
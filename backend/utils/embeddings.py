@@ -0,0 +1,61 @@
+"""
+Local sentence embeddings, shared by features that need semantic similarity
+without an LLM round trip.
+
+Uses the same SentenceTransformer model as the chatbot (EMBEDDING_MODEL). The
+dependency is optional: if sentence-transformers is not installed, `embed`
+returns None and callers fall back to their non-embedding path.
+"""
+import asyncio
+import math
+import os
+import threading
+from typing import List, Optional
+
+from utils.logger import logging
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+_model = None
+_unavailable = False
+_load_lock = threading.Lock()
+
+
+def _get_model():
+    """Load the model on first use (it takes a few seconds and ~100MB)."""
+    global _model, _unavailable
+    with _load_lock:
+        if _model is None and not _unavailable:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                logging.warning("sentence-transformers is not installed, embedding features are disabled")
+                _unavailable = True
+                return None
+            logging.info(f"Loading embedding model: {EMBEDDING_MODEL}")
+            _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+
+def _encode_sync(texts: List[str]) -> Optional[List[List[float]]]:
+    model = _get_model()
+    if model is None:
+        return None
+    return model.encode(texts, normalize_embeddings=True).tolist()
+
+
+async def embed(texts: List[str]) -> Optional[List[List[float]]]:
+    """Unit-length embeddings for `texts`, computed off the event loop; None if embeddings are unavailable."""
+    if _unavailable:
+        return None
+    try:
+        return await asyncio.to_thread(_encode_sync, texts)
+    except Exception:
+        logging.exception("Embedding failed")
+        return None
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
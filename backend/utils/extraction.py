@@ -0,0 +1,117 @@
+import asyncio
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from utils.logger import logging
+
+# Resume text extraction runs in a few single-process workers so a large or
+# malformed document never blocks the event loop, and each upload is parsed
+# from its own in-memory buffer (no shared temp file). Each job has a worker to
+# itself, so a timeout or crash only takes down that job's process.
+EXTRACTION_WORKERS = int(os.getenv("RESUME_EXTRACTION_WORKERS", "2"))
+EXTRACTION_TIMEOUT = float(os.getenv("RESUME_EXTRACTION_TIMEOUT_SECONDS", "20"))
+MAX_PDF_PAGES = int(os.getenv("RESUME_MAX_PAGES", "10"))
+
+SUPPORTED_EXTENSIONS = ("pdf", "docx", "doc", "txt")
+
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+def sniff_file_type(head: bytes) -> str | None:
+    """
+    Guess the document type from its leading bytes.
+
+    Returns "pdf", "zip" (possibly DOCX, confirm with is_docx once fully read)
+    or None for anything else.
+    """
+    # PDF allows a little junk before the header
+    if PDF_MAGIC in head[:1024]:
+        return "pdf"
+    if head.startswith(ZIP_MAGIC):
+        return "zip"
+    return None
+
+
+def is_docx(contents: bytes) -> bool:
+    """True if a ZIP archive is a Word document (has word/document.xml)."""
+    try:
+        with zipfile.ZipFile(BytesIO(contents)) as archive:
+            return "word/document.xml" in archive.namelist()
+    except zipfile.BadZipFile:
+        return False
+
+
+class ExtractionError(Exception):
+    """Raised when a resume cannot be turned into text (bad file, timeout)."""
+
+
+def _extract_sync(contents: bytes, ext: str, max_pages: int) -> str:
+    """Worker-process entry point: bytes in, plain text out."""
+    if ext == "pdf":
+        from pypdf import PdfReader
+        reader = PdfReader(BytesIO(contents))
+        return "\n".join(page.extract_text() or "" for page in reader.pages[:max_pages])
+    if ext in ("docx", "doc"):
+        import docx2txt
+        return docx2txt.process(BytesIO(contents))
+    if ext == "txt":
+        return contents.decode("utf-8", errors="ignore")
+    raise ValueError(f"Unsupported file format: {ext}")
+
+
+_workers: asyncio.Queue | None = None
+
+
+def _new_worker() -> ProcessPoolExecutor:
+    # spawn rather than fork: the parent holds an event loop and driver threads
+    return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _get_workers() -> asyncio.Queue:
+    global _workers
+    if _workers is None:
+        _workers = asyncio.Queue()
+        for _ in range(EXTRACTION_WORKERS):
+            _workers.put_nowait(_new_worker())
+    return _workers
+
+
+def _kill_worker(worker: ProcessPoolExecutor) -> None:
+    """Kill a worker after a timeout or crash so a stuck parse doesn't keep holding its slot."""
+    for process in list(getattr(worker, "_processes", {}).values()):
+        process.terminate()
+    worker.shutdown(wait=False, cancel_futures=True)
+
+
+async def extract_resume_text(contents: bytes, ext: str) -> str:
+    """Extract resume text off the event loop, bounded by MAX_PDF_PAGES and EXTRACTION_TIMEOUT."""
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ExtractionError(f"Unsupported file format: {ext}")
+
+    loop = asyncio.get_running_loop()
+    workers = _get_workers()
+    worker = await workers.get()
+    try:
+        future = loop.run_in_executor(worker, _extract_sync, contents, ext, MAX_PDF_PAGES)
+        try:
+            return await asyncio.wait_for(future, timeout=EXTRACTION_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.error(f"Resume extraction timed out after {EXTRACTION_TIMEOUT}s ({ext}, {len(contents)} bytes)")
+            _kill_worker(worker)
+            worker = _new_worker()
+            raise ExtractionError("Resume extraction timed out")
+        except BrokenProcessPool as e:
+            # The worker died (e.g. out of memory on a hostile PDF); only this job's worker is replaced
+            logging.error("Resume extraction worker died, replacing it")
+            _kill_worker(worker)
+            worker = _new_worker()
+            raise ExtractionError(f"Could not read resume: {e}") from e
+        except Exception as e:
+            raise ExtractionError(f"Could not read resume: {e}") from e
+    finally:
+        workers.put_nowait(worker)
@@ -0,0 +1,291 @@
+"""
+Durable job queue for slow (LLM-heavy) operations.
+
+Jobs live in the Mongo "Jobs" collection, so a queued or half-finished job
+survives a worker restart or deploy. Job types are grouped into lanes, and
+each process runs a few async workers per lane (JOB_WORKERS_<LANE>), so long
+background jobs can't starve quick ones. A worker claims the oldest runnable
+job of its lane with an atomic find-and-update and holds it under a lease
+that it renews while the job runs; a job whose lease expires (its worker
+died) is picked up again by any process. Failures are retried with exponential backoff up to
+the job's max_attempts. A client-supplied idempotency key maps repeat
+submissions by the same user onto the original job. A job's payload (which
+may be a whole upload) is only read by the worker running it and is dropped
+once the job finishes.
+
+Handlers are registered per job type with `register_handler` and receive
+(payload, user_id); whatever dict they return becomes the job's result.
+"""
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from connections.mongo_client import MongoDBClient
+from llms.priority import llm_user
+from utils.logger import logging
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job is considered abandoned (and re-queued) once its lease expires;
+# its worker renews the lease every third of this while the job runs
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# A single run of a handler is cancelled (and retried) after this long
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "300"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+# Finished jobs (and their results) are removed this long after they finish
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Job types per lane; types not listed here run in the "default" lane
+_LANE_TYPES = {
+    "resume": ("parse_resume", "save_resume"),
+    "interactive": ("questions", "mock_questions", "rating"),
+    "background": ("pregenerate_questions",),
+}
+_DEFAULT_LANE_WORKERS = {"resume": 2, "interactive": 4, "background": 2, "default": 1}
+
+COLLECTION = "Jobs"
+# Status and result reads never need the payload
+_WITHOUT_PAYLOAD = {"payload": 0}
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+Handler = Callable[[dict, Optional[str]], Awaitable[Optional[dict]]]
+
+_client = MongoDBClient()
+_handlers: Dict[str, Handler] = {}
+_workers: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+_indexed = False
+
+
+class JobFailed(Exception):
+    """Raise from a handler to fail the job immediately, without retries (e.g. an unreadable upload)."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def register_handler(job_type: str, handler: Handler) -> None:
+    _handlers[job_type] = handler
+
+
+def lane_workers(lane: str) -> int:
+    """Workers per process for `lane`; override with JOB_WORKERS_<LANE>."""
+    return int(os.getenv(f"JOB_WORKERS_{lane.upper()}", _DEFAULT_LANE_WORKERS[lane]))
+
+
+def _lane_filter(lane: str) -> dict:
+    if lane in _LANE_TYPES:
+        return {"type": {"$in": list(_LANE_TYPES[lane])}}
+    return {"type": {"$nin": [job_type for types in _LANE_TYPES.values() for job_type in types]}}
+
+
+async def _ensure_indexes() -> None:
+    global _indexed
+    if not _indexed:
+        collection = _client.get_collection(COLLECTION)
+        await collection.create_index([("type", 1), ("status", 1), ("run_after", 1), ("created_at", 1)])
+        await collection.create_index(
+            [("user_id", 1), ("idempotency_key", 1)],
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}},
+        )
+        await collection.create_index("finished_at", expireAfterSeconds=JOB_RESULT_TTL_SECONDS)
+        _indexed = True
+
+
+async def enqueue_job(
+    job_type: str,
+    user_id: Optional[str],
+    payload: dict,
+    idempotency_key: Optional[str] = None,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> dict:
+    """Queue a job and return its document; with an idempotency key, an existing job for the same user and key is returned instead."""
+    await _ensure_indexes()
+    collection = _client.get_collection(COLLECTION)
+    if idempotency_key:
+        existing = await find_job(user_id, idempotency_key)
+        if existing:
+            return existing
+
+    now = _now()
+    job = {
+        "_id": uuid.uuid4().hex,
+        "type": job_type,
+        "user_id": user_id,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_after": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if idempotency_key:
+        job["idempotency_key"] = idempotency_key
+    try:
+        await collection.insert_one(job)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent submission using the same key
+        return await find_job(user_id, idempotency_key)
+
+    logging.info(f"Queued {job_type} job {job['_id']} for user_id: {user_id}")
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+
+async def get_job(job_id: str, user_id: Optional[str]) -> Optional[dict]:
+    """The job without its payload, if it exists and belongs to `user_id`."""
+    return await _client.find_one(COLLECTION, {"_id": job_id, "user_id": user_id}, projection=_WITHOUT_PAYLOAD)
+
+
+async def find_job(user_id: Optional[str], idempotency_key: str) -> Optional[dict]:
+    """The job (without its payload) `user_id` submitted under `idempotency_key`, if any."""
+    return await _client.find_one(
+        COLLECTION, {"user_id": user_id, "idempotency_key": idempotency_key}, projection=_WITHOUT_PAYLOAD
+    )
+
+
+async def retry_job(job: dict, payload: dict) -> dict:
+    """Queue a failed job again with `payload` and a fresh set of attempts, keeping its id and idempotency key."""
+    now = _now()
+    update = {"status": "queued", "payload": payload, "attempts": 0, "run_after": now, "updated_at": now}
+    await _client.get_collection(COLLECTION).update_one(
+        {"_id": job["_id"], "status": "failed"}, {"$set": update, "$unset": {"finished_at": "", "error": ""}}
+    )
+    logging.info(f"Re-queued failed {job['type']} job {job['_id']} for user_id: {job['user_id']}")
+    if _wakeup is not None:
+        _wakeup.set()
+    return {**job, **update}
+
+
+async def _claim(lane: str) -> Optional[dict]:
+    now = _now()
+    return await _client.get_collection(COLLECTION).find_one_and_update(
+        {**_lane_filter(lane), "$or": [
+            {"status": "queued", "run_after": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}},
+        ]},
+        {
+            "$set": {"status": "running", "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                     "worker": WORKER_ID, "updated_at": now},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _finish(job: dict, update: dict) -> None:
+    # Matching on attempts keeps a worker whose lease expired from overwriting a newer run
+    update["updated_at"] = _now()
+    unset = {"lease_until": ""}
+    if "finished_at" in update:
+        # Finished for good: the payload is no longer needed
+        unset["payload"] = ""
+    await _client.get_collection(COLLECTION).update_one(
+        {"_id": job["_id"], "attempts": job["attempts"]}, {"$set": update, "$unset": unset}
+    )
+
+
+async def _renew_lease(job: dict) -> None:
+    """Keep extending a running job's lease so no other worker claims it while it is still being worked on."""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            await _client.get_collection(COLLECTION).update_one(
+                {"_id": job["_id"], "attempts": job["attempts"], "status": "running"},
+                {"$set": {"lease_until": _now() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+            )
+        except Exception:
+            logging.warning(f"Could not renew the lease of job {job['_id']}")
+
+
+async def _run(job: dict) -> None:
+    handler = _handlers.get(job["type"])
+    if handler is None:
+        await _finish(job, {"status": "failed", "error": f"No handler for job type {job['type']}", "finished_at": _now()})
+        return
+    if job["attempts"] > job["max_attempts"]:
+        await _finish(job, {"status": "failed", "error": "Job was abandoned too many times", "finished_at": _now()})
+        return
+
+    renewal = asyncio.create_task(_renew_lease(job))
+    try:
+        with llm_user(job["user_id"]):
+            result = await asyncio.wait_for(handler(job["payload"], job["user_id"]), timeout=JOB_TIMEOUT_SECONDS)
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back right away instead of waiting for the lease to expire
+        await asyncio.shield(_client.get_collection(COLLECTION).update_one(
+            {"_id": job["_id"], "attempts": job["attempts"]},
+            {"$set": {"status": "queued", "run_after": _now(), "updated_at": _now()},
+             "$unset": {"lease_until": ""}, "$inc": {"attempts": -1}},
+        ))
+        raise
+    except JobFailed as e:
+        logging.warning(f"Job {job['_id']} ({job['type']}) failed permanently: {e}")
+        await _finish(job, {"status": "failed", "error": str(e), "finished_at": _now()})
+        return
+    except Exception as e:
+        logging.exception(f"Job {job['_id']} ({job['type']}) failed on attempt {job['attempts']}")
+        if job["attempts"] < job["max_attempts"]:
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+            await _finish(job, {"status": "queued", "error": str(e), "run_after": _now() + timedelta(seconds=delay)})
+        else:
+            await _finish(job, {"status": "failed", "error": str(e), "finished_at": _now()})
+        return
+    finally:
+        renewal.cancel()
+
+    await _finish(job, {"status": "succeeded", "result": result, "error": None, "finished_at": _now()})
+    logging.info(f"Job {job['_id']} ({job['type']}) succeeded")
+
+
+async def _worker(lane: str, index: int) -> None:
+    while True:
+        try:
+            job = await _claim(lane)
+        except Exception:
+            logging.exception("Job queue poll failed")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            continue
+        try:
+            await _run(job)
+        except Exception:
+            # e.g. Mongo unreachable while recording the outcome; the lease expiry will retry the job
+            logging.exception(f"Job worker {lane}/{index} could not record the outcome of job {job['_id']}")
+
+
+async def start_workers() -> None:
+    global _wakeup
+    _wakeup = asyncio.Event()
+    try:
+        await _ensure_indexes()
+    except Exception:
+        logging.exception("Could not create job queue indexes")
+    lanes = {lane: lane_workers(lane) for lane in _DEFAULT_LANE_WORKERS}
+    for lane, count in lanes.items():
+        _workers.extend(asyncio.create_task(_worker(lane, index)) for index in range(count))
+    logging.info(f"Started job workers {lanes} ({WORKER_ID})")
+
+
+async def stop_workers() -> None:
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
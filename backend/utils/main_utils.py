@@ -1,65 +1,436 @@
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
 import os, sys
 from fastapi import HTTPException
 from langchain.prompts import PromptTemplate
 from llms.llmFactory import LLMFactory
-from llms.wrapper import protected_invoke
-from utils.promts import parse_resume_prompt, questions_prompt, mock_question_prompt, rating_prompt
+from llms.hedging import invoke_with_fallback
+from llms.wrapper import protected_stream
+from llms.circuit_breaker import get_breaker
+from llms.chain_registry import ChainRegistry
+from llms import singleflight
+from llms.priority import llm_priority
+from llms.routing import llm_task, ordered_routes
+from llms.deadline import DeadlineExceeded, deadline_margin
+from utils.promts import (
+    parse_resume_prompt, questions_prompt, mock_question_prompt, rating_prompt, rating_batch_prompt, batch_focus_suffix,
+    resume_section_prompt, resume_section_instructions,
+    questions_prompt_prefix, questions_resume_segment, questions_prompt_tail,
+    mock_question_prompt_prefix, mock_question_resume_segment, mock_question_prompt_tail,
+)
 from utils.exception import MyException
 from utils.logger import logging
+from utils.cache import MongoLRUCache
+from utils.jobs import enqueue_job, find_job, retry_job
+from utils import question_bank
+from utils.extraction import extract_resume_text, ExtractionError, SUPPORTED_EXTENSIONS
+from utils.provisional_rating import provisional_rating
+from utils.resume_preextract import pre_extract, apply_pre_extracted, PRE_EXTRACTION_VERSION
+from models.schemas import (
+    ParsedResume, ResumeProfileSection, ResumeExperienceSection, ResumeEducationSection, ResumeProjectsSection,
+    QuestionListResponse, SingleQues, MockResponse, MockQuestion, RatingResponse, IndexedRatingList,
+    RatingStatusResponse, ProvisionalRatingResponse,
+)
 from langchain.output_parsers import PydanticOutputParser
 from langchain.schema.output_parser import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import JsonOutputParser
 import json
+import asyncio
+import hashlib
+import re
+from contextlib import aclosing
 
 
 # --------- Resume Parsing ---------
-llms = LLMFactory.get_all_providers() 
-
-async def parse_resume(file, parser):
-    """Extract text from resume and parse into structured JSON."""
-    parser = PydanticOutputParser(pydantic_object=parser)
-
-    ext = file.filename.split(".")[-1].lower()
-    temp_path = f"temp_resume.{ext}"
-
-    # Save uploaded file temporarily
-    with open(temp_path, "wb") as f:
-        f.write(file.file.read())
-
-    # Choose loader based on extension
-    if ext == "pdf":
-        loader = PyPDFLoader(temp_path)
-    elif ext in ["docx", "doc"]:
-        loader = Docx2txtLoader(temp_path)
-    elif ext == "txt":
-        loader = TextLoader(temp_path)
-    else:
+# One client per model route in the routing table; each task picks its own ordered subset
+llms = LLMFactory.get_routed_providers()
+
+# Large question sets are split into sub-batches generated concurrently
+QUESTION_BATCH_SIZE = int(os.getenv("QUESTION_BATCH_SIZE", "10"))
+# Output-token budget per generated item (plus a fixed allowance for the JSON envelope)
+MCQ_TOKENS_PER_QUESTION = 300
+MOCK_TOKENS_PER_QUESTION = 400
+BATCH_TOKEN_OVERHEAD = 200
+# Batches are cut off this long before the request deadline, leaving time to merge and return the ones that finished
+BATCH_DEADLINE_MARGIN_SECONDS = float(os.getenv("QUESTION_BATCH_DEADLINE_MARGIN_SECONDS", "2"))
+# Questions whose word sets overlap at least this much (Jaccard, 0-1) with an earlier one are dropped when merging batches
+DUPLICATE_SIMILARITY = 0.9
+# Scheduler priority class per task (see llms.priority); anything unlisted is "generation"
+TASK_PRIORITIES = {"rating": "interactive", "rating_batch": "interactive", "bot": "interactive"}
+
+
+def task_priority(task: str) -> str:
+    return TASK_PRIORITIES.get(task, "generation")
+
+
+def _deadline_exceeded() -> HTTPException:
+    return HTTPException(
+        status_code=504,
+        detail={
+            "error": "Deadline Exceeded",
+            "message": "The AI took too long to respond, please try again.",
+            "code": 5001
+        }
+    )
+
+
+def _providers_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail={
+            "error": "AI Unavailable",
+            "message": "No AI provider could generate a response, please try again later.",
+            "code": 5003
+        }
+    )
+
+def _healthy_llms(task: str = None):
+    """
+    The task's model routes whose circuit breaker is closed, in routing order
+    (see llms.routing; every route when no task is given). Routes with an open
+    breaker are skipped and, once their cooldown has passed, probed in the
+    background.
+    """
+    models = dict(llms)
+    healthy = []
+    for name in (ordered_routes(task) if task else models):
+        model = models.get(name)
+        if model is None:
+            continue
+        breaker = get_breaker(name)
+        if breaker.allow_request():
+            healthy.append((name, model))
+        else:
+            breaker.maybe_probe(lambda model=model: model.ainvoke("ping"))
+
+    if not healthy:
+        logging.warning("All LLM provider circuit breakers are open")
+    return healthy
+
+
+async def _invoke_llms(task: str, input_data: dict):
+    """
+    Run the task's precompiled chain against every healthy provider (hedged) and
+    return the first result. Concurrent identical calls (same task and input,
+    e.g. a double-click or client retry) share a single in-flight invocation.
+    """
+    key = singleflight.coalesce_key(task, input_data)
+    return await singleflight.do(key, lambda: _invoke_llms_once(task, input_data))
+
+
+async def _invoke_llms_once(task: str, input_data: dict):
+    chains = [(name, chain_registry.get(task, name)) for name, _ in _healthy_llms(task)]
+    if not chains:
+        return None
+    with llm_priority(task_priority(task)), llm_task(task):
+        return await invoke_with_fallback(chains, input_data)
+
+
+def _batch_sizes(total: int) -> list:
+    """Split `total` into near-equal batches of at most QUESTION_BATCH_SIZE."""
+    count = max(1, -(-total // QUESTION_BATCH_SIZE))
+    base, extra = divmod(total, count)
+    return [base + (1 if i < extra else 0) for i in range(count)]
+
+
+def _batch_focus(input_data: dict, index: int, count: int) -> str:
+    """Give each batch its own slice of the candidate's skills and projects so batches don't overlap."""
+    resume = input_data.get("resume_text") or {}
+    if not isinstance(resume, dict):
+        return "a different area of the candidate's background than the other batches"
+    topics = list(resume.get("skills") or []) + [p.get("name", "") for p in resume.get("projects") or []]
+    topics = [t for t in topics if t]
+    chunk = topics[index::count]
+    return ", ".join(chunk) if chunk else "core concepts for the role"
+
+
+def _question_words(text: str) -> frozenset:
+    return frozenset(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _dedupe_questions(questions: list) -> list:
+    """Drop questions that are near-identical (same words, give or take punctuation/order) to one already kept."""
+    kept, seen = [], []
+    for question in questions:
+        words = _question_words(question.question)
+        if any(len(words & other) / max(1, len(words | other)) >= DUPLICATE_SIMILARITY for other in seen):
+            continue
+        seen.append(words)
+        kept.append(question)
+    return kept
+
+
+async def _generate_in_batches(task: str, input_data: dict, tokens_per_question: int):
+    """
+    Generate `num_questions` as concurrent sub-batches and merge the results.
+
+    Each batch asks for its share of the questions with an output-token budget
+    sized to it, starts on a different provider (hedging still applies within a
+    batch) and focuses on its own slice of the resume. A failed batch only loses
+    its own questions; None is returned only if every batch fails. Identical
+    concurrent requests share one run.
+    """
+    key = singleflight.coalesce_key(task, input_data)
+    return await singleflight.do(key, lambda: _generate_batches_once(task, input_data, tokens_per_question))
+
+
+async def _generate_batches_once(task: str, input_data: dict, tokens_per_question: int):
+    total = int(input_data.get("num_questions", QUESTION_BATCH_SIZE))
+    sizes = _batch_sizes(total)
+    # Multi-batch runs use the task's variant with the batch-focus suffix
+    batch_task = f"{task}_batch" if len(sizes) > 1 else task
+
+    async def run_batch(index: int, size: int):
+        providers = _healthy_llms(batch_task)
+        if not providers:
+            return None
+        shift = index % len(providers)
+        providers = providers[shift:] + providers[:shift]
+        budget = size * tokens_per_question + BATCH_TOKEN_OVERHEAD
+        chains = [(name, chain_registry.get(batch_task, name, max_tokens=budget)) for name, _ in providers]
+
+        batch_input = {**input_data, "num_questions": size}
+        if len(sizes) > 1:
+            batch_input.update(
+                batch_index=index + 1,
+                batch_count=len(sizes),
+                batch_focus=_batch_focus(input_data, index, len(sizes)),
+            )
+        return await invoke_with_fallback(chains, batch_input)
+
+    # Batches stop short of the request deadline so the ones that finished can
+    # still be returned before the caller's own wait runs out
+    with llm_task(batch_task), deadline_margin(BATCH_DEADLINE_MARGIN_SECONDS):
+        results = await asyncio.gather(*(run_batch(i, size) for i, size in enumerate(sizes)), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, DeadlineExceeded):
+            raise result
+    batches = [result for result in results if result and not isinstance(result, Exception)]
+    if not batches:
+        # Batches that beat the deadline are still served; only a total miss is an error
+        if any(isinstance(result, DeadlineExceeded) for result in results):
+            raise DeadlineExceeded("Request deadline exceeded")
+        return None
+    if len(batches) < len(sizes):
+        logging.warning(f"{len(sizes) - len(batches)} of {len(sizes)} question batches failed")
+
+    questions = _dedupe_questions([q for batch in batches for q in batch.questions])[:total]
+    return chain_registry.parser(task).pydantic_object(questions=questions)
+
+
+async def _generate_with_bank(task: str, item_model, input_data: dict, tokens_per_question: int, user_id: str = None):
+    """
+    Serve as many questions as possible from the question bank and generate
+    only the remainder; freshly generated questions are banked for next time.
+    """
+    schema = chain_registry.parser(task).pydantic_object
+    banked = [item_model(**question) for question in await question_bank.retrieve(task, input_data, user_id)]
+    remaining = input_data["num_questions"] - len(banked)
+    if remaining <= 0:
+        return schema(questions=banked)
+
+    generated = await _generate_in_batches(task, {**input_data, "num_questions": remaining}, tokens_per_question)
+    if generated is None:
+        return schema(questions=banked) if banked else None
+    question_bank.store_in_background(task, input_data, generated.questions)
+    return schema(questions=_dedupe_questions(banked + generated.questions))
+
+
+async def _stream_with_bank(task: str, item_model, input_data: dict, user_id: str = None):
+    """Streaming counterpart of _generate_with_bank: banked questions are yielded first, then the generated remainder."""
+    banked = [item_model(**question) for question in await question_bank.retrieve(task, input_data, user_id)]
+    for question in banked:
+        yield question
+    remaining = input_data["num_questions"] - len(banked)
+    if remaining <= 0:
+        return
+
+    generated = []
+    stream = _stream_list_items(f"{task}_stream", "questions", item_model, {**input_data, "num_questions": remaining})
+    async with aclosing(stream):
+        async for question in stream:
+            generated.append(question)
+            yield question
+            if len(generated) >= remaining:
+                break
+    question_bank.store_in_background(task, input_data, generated)
+
+
+async def _stream_list_items(task: str, list_key: str, item_model, input_data: dict):
+    """
+    Stream a `{list_key: [...]}` JSON completion and yield each list element as
+    a validated `item_model` as soon as it is complete.
+
+    An element is complete once the incremental JSON parser has started the next
+    one (or the stream has ended). Providers are tried in order; a provider that
+    fails before emitting anything falls through to the next one, but a failure
+    mid-stream is raised since the client has already received part of the set.
+    Raises a 503 when no provider produced a single item.
+    """
+    for name, _ in _healthy_llms(task):
+        chain = chain_registry.get(task, name)
+        emitted = 0
+        items = []
+        try:
+            async for partial in protected_stream(chain, input_data, provider=name):
+                items = (partial.get(list_key) or []) if isinstance(partial, dict) else []
+                while emitted < len(items) - 1:
+                    item = _validate_item(item_model, items[emitted])
+                    emitted += 1
+                    if item:
+                        yield item
+            while emitted < len(items):
+                item = _validate_item(item_model, items[emitted])
+                emitted += 1
+                if item:
+                    yield item
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if emitted:
+                logging.exception(f"Stream from {name} failed after {emitted} items")
+                raise MyException(e, sys)
+            logging.warning(f"Stream from {name} failed before any output, trying next provider: {e}")
+            continue
+        if emitted:
+            return
+    raise _providers_unavailable()
+
+
+def _validate_item(item_model, data):
+    try:
+        return item_model(**data)
+    except Exception:
+        logging.warning(f"Dropping malformed streamed item: {data}")
+        return None
+
+# Parsed resumes are cached by file content; bumping the prompt or schema changes the version and invalidates old entries
+RESUME_PARSER_VERSION = hashlib.sha256(
+    (parse_resume_prompt + resume_section_prompt + json.dumps(resume_section_instructions, sort_keys=True)
+     + PRE_EXTRACTION_VERSION + json.dumps(ParsedResume.model_json_schema(), sort_keys=True)).encode()
+).hexdigest()[:12]
+resume_cache = MongoLRUCache("ResumeCache", maxsize=int(os.getenv("RESUME_CACHE_SIZE", "256")))
+# Fill email/skills with rules and send only the residual sections to the LLM
+RESUME_PRE_EXTRACTION = os.getenv("RESUME_PRE_EXTRACTION", "true").lower() == "true"
+# "single": one LLM call for the whole resume; "sectioned": one concurrent call per section;
+# "auto": sectioned once the text sent to the model exceeds RESUME_SECTIONED_MIN_CHARS
+RESUME_PARSE_MODE = os.getenv("RESUME_PARSE_MODE", "auto").lower()
+RESUME_SECTIONED_MIN_CHARS = int(os.getenv("RESUME_SECTIONED_MIN_CHARS", "4000"))
+
+# (section model, resume sections it is parsed from)
+RESUME_SECTION_PARSERS = {
+    "profile": (ResumeProfileSection, ["header", "summary", "skills", "certifications"]),
+    "experience": (ResumeExperienceSection, ["summary", "experience"]),
+    "education": (ResumeEducationSection, ["education"]),
+    "projects": (ResumeProjectsSection, ["projects", "achievements"]),
+}
+
+
+def _use_sectioned_parse(pre, resume_text: str) -> bool:
+    # Sectioning needs the splitter to have found real sections, not just a header
+    if pre is None or len(pre.sections) < 2:
+        return False
+    if RESUME_PARSE_MODE == "sectioned":
+        return True
+    return RESUME_PARSE_MODE == "auto" and len(resume_text) >= RESUME_SECTIONED_MIN_CHARS
+
+
+async def _parse_resume_sections(pre):
+    """
+    Parse each resume section with its own small schema, concurrently, and merge
+    the pieces into a ParsedResume. Sections with no text are skipped. Returns None
+    if any call fails, so the caller can fall back to a single full parse.
+    """
+    texts = {}
+    for section, (_, sources) in RESUME_SECTION_PARSERS.items():
+        text = "\n\n".join(pre.sections[name] for name in sources if pre.sections.get(name))
+        if text:
+            texts[section] = text
+
+    results = await asyncio.gather(*(
+        _invoke_llms(f"resume_section:{section}", {"section_text": text}) for section, text in texts.items()
+    ))
+    if any(result is None for result in results):
+        logging.warning("Sectioned resume parse incomplete, falling back to a single call")
+        return None
+
+    merged = {}
+    for result in results:
+        merged.update(result.model_dump())
+    return ParsedResume(**merged)
+
+
+def resume_cache_key(contents: bytes) -> str:
+    """Content address of an uploaded resume: SHA-256 of the bytes plus the parser version."""
+    return f"{hashlib.sha256(contents).hexdigest()}:{RESUME_PARSER_VERSION}"
+
+
+# Ratings are cached on the normalized (question, expected_answer, user_answer) triple;
+# the version covers the prompt and response schema so editing either invalidates old entries
+RATING_PROMPT_VERSION = hashlib.sha256(
+    (rating_prompt + json.dumps(RatingResponse.model_json_schema(), sort_keys=True)).encode()
+).hexdigest()[:12]
+rating_cache = MongoLRUCache(
+    "RatingCache",
+    maxsize=int(os.getenv("RATING_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("RATING_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+)
+
+
+def _normalize_text(text: str) -> str:
+    # Case and whitespace differences shouldn't change the rating
+    return " ".join((text or "").split()).lower()
+
+
+def rating_cache_key(input_data: dict) -> str:
+    fields = [_normalize_text(input_data.get(name, "")) for name in ("question", "expected_answer", "user_answer")]
+    digest = hashlib.sha256("\x1f".join(fields).encode()).hexdigest()
+    return f"{digest}:{RATING_PROMPT_VERSION}"
+
+
+async def parse_resume(contents: bytes, ext: str):
+    """Extract text from the uploaded resume bytes (of type `ext`, e.g. "pdf") and parse into a ParsedResume."""
+    if ext not in SUPPORTED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Unsupported file format")
 
-    # Read and join text from file
+    # Extract text in the worker pool, straight from the in-memory upload
     try:
-        documents = loader.load()
-        resume_text = "\n".join([doc.page_content for doc in documents])
-    except Exception as e:
+        resume_text = await extract_resume_text(contents, ext)
+    except ExtractionError as e:
         logging.exception("Error loading document")
-        raise MyException(e, sys)
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "Unreadable File",
+                "message": str(e),
+                "code": 2003
+            }
+        )
+
+    pre = None
+    if RESUME_PRE_EXTRACTION:
+        pre = pre_extract(resume_text)
+        if pre.residual_text:
+            logging.info(f"Pre-extraction reduced resume text from {len(resume_text)} to {len(pre.residual_text)} chars")
+            resume_text = pre.residual_text
+
+    if _use_sectioned_parse(pre, resume_text):
+        try:
+            result = await _parse_resume_sections(pre)
+        except DeadlineExceeded:
+            raise _deadline_exceeded()
+        except Exception as e:
+            logging.exception("Error generating AI response for sectioned resume parsing")
+            raise MyException(e, sys)
+        if result:
+            return apply_pre_extracted(result, pre)
 
-    # Create prompt
-   # prompt = PromptTemplate.from_template(parse_resume_prompt)
-    prompt = PromptTemplate(
-        template = parse_resume_prompt ,
-        input_variables=["resume_text"],
-        partial_variables = {"format_instructions": parser.get_format_instructions()}
-    )
-    
     # Call AI model
     try:
-        for model in llms:
-            chain = prompt | model | parser
-            result = await protected_invoke(chain, {"resume_text": resume_text})
-            if result:
-                return result
+        result = await _invoke_llms("parse_resume", {"resume_text": resume_text})
+        if result:
+            return apply_pre_extracted(result, pre) if pre else result
+    except DeadlineExceeded:
+        raise _deadline_exceeded()
     except Exception as e:
         logging.exception("Error generating AI response for resume parsing")
         raise MyException(e, sys)
@@ -68,21 +439,14 @@ async def parse_resume(file, parser):
   
 
 
-async def get_questions_from_resume(parser, input_data: dict):
-    """Generate interview questions with answers from resume info."""
-    parser = PydanticOutputParser(pydantic_object=parser)
-
-    prompt = PromptTemplate(
-        template=questions_prompt,
-        input_variables=["resume_text", "num_questions", "difficulty_level", "interview_type", "interview_description","target_companies"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
+async def get_questions_from_resume(input_data: dict, user_id: str = None):
+    """Generate interview questions with answers from resume info, skipping banked questions `user_id` has already seen."""
     try:
-        for model in llms:
-            chain = prompt | model | parser
-            result = await protected_invoke(chain, input_data)
-            if result:
-                return result
+        result = await _generate_with_bank("questions", SingleQues, input_data, MCQ_TOKENS_PER_QUESTION, user_id)
+        if result:
+            return result
+    except DeadlineExceeded:
+        raise _deadline_exceeded()
     except Exception as e:
         logging.exception("Error generating AI response for resume parsing")
         raise MyException(e, sys)
@@ -92,38 +456,25 @@ async def get_questions_from_resume(parser, input_data: dict):
 
 async def get_bot_ans(question: str):
     """Return the answer given by the bot for a question."""
-    str_parser = StrOutputParser()
-    prompt = ChatPromptTemplate.from_messages([
-        ("human", "{question}")
-    ])
     try:
-        for model in llms:
-            chain = prompt | model | str_parser
-            result = await protected_invoke(chain, {"question": question})
-            if result:
-                return result
+        result = await _invoke_llms("bot", {"question": question})
+        if result:
+            return result
+    except DeadlineExceeded:
+        raise _deadline_exceeded()
     except Exception as e:
         logging.exception("Error generating AI response for bot answer")
         raise MyException(e, sys)
 
-async def get_mock_questions( input_data: dict,parser=None):
-    """Generate interview questions with answers from resume info."""
-    parser = PydanticOutputParser(pydantic_object=parser)
-    prompt = PromptTemplate(
-        template = mock_question_prompt,
-        input_variables=["resume_text", "num_questions", "difficulty_level", "interview_type", "job_description"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
-    
-    
-    # chain = prompt | model.model | parser
-    # response = await chain.ainvoke(input_data)
+
+async def get_mock_questions(input_data: dict, user_id: str = None):
+    """Generate interview questions with answers from resume info, skipping banked questions `user_id` has already seen."""
     try:
-        for model in llms:
-            chain = prompt | model | parser
-            result = await protected_invoke(chain, input_data)
-            if result:
-                return result
+        result = await _generate_with_bank("mock_questions", MockQuestion, input_data, MOCK_TOKENS_PER_QUESTION, user_id)
+        if result:
+            return result
+    except DeadlineExceeded:
+        raise _deadline_exceeded()
     except Exception as e:
         logging.exception("Error generating AI response for resume parsing")
         raise MyException(e, sys)
@@ -131,23 +482,247 @@ async def get_mock_questions( input_data: dict,parser=None):
     logging.info("Questions generated successfully from AI")
 
    
-async def get_mock_rating(input_data:dict,parser):
-    parser = PydanticOutputParser(pydantic_object=parser)
-    prompt = PromptTemplate(
-        template = rating_prompt,
-        input_variables=["question","expected_answer","user_answer"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
-    
+async def get_mock_rating(input_data:dict):
+    key = rating_cache_key(input_data)
+    cached = await rating_cache.get(key)
+    if cached:
+        logging.info("Rating served from cache")
+        return RatingResponse(**cached)
+
     try:
-        for model in llms:
-            chain = prompt | model | parser
-            result = await protected_invoke(chain, input_data)
-            if result:
-                return result
+        result = await _invoke_llms("rating", input_data)
+        if result:
+            await rating_cache.set(key, result.model_dump())
+            return result
+    except DeadlineExceeded:
+        raise _deadline_exceeded()
     except Exception as e:
         logging.exception("Error generating AI response for rating")
         raise MyException(e, sys)
     
     logging.info("Rating generated successfully from AI")
-   
\ No newline at end of file
+
+
+async def get_provisional_rating(input_data: dict) -> ProvisionalRatingResponse:
+    """
+    First phase of the two-phase rater: an instant local score plus the id the
+    full LLM rating will be stored under. If that rating is already cached it
+    is returned straight away with status "ready".
+    """
+    rating_id = rating_cache_key(input_data)
+    cached = await rating_cache.get(rating_id)
+    if cached:
+        result = RatingResponse(**cached)
+        return ProvisionalRatingResponse(rating_id=rating_id, status="ready", result=result, provisional_rating=result.rating)
+
+    score = await provisional_rating(input_data["expected_answer"], input_data["user_answer"])
+    return ProvisionalRatingResponse(rating_id=rating_id, status="pending", provisional_rating=score)
+
+
+def _rating_job_key(rating_id: str) -> str:
+    return f"rating:{rating_id}"
+
+
+async def refine_rating(input_data: dict, user_id: str) -> None:
+    """
+    Second phase: queue the LLM rating as a durable "rating" job (see
+    utils.jobs), which get_mock_rating caches under the rating id. A rating
+    whose previous job failed is queued again.
+    """
+    rating_id = rating_cache_key(input_data)
+    job = await enqueue_job("rating", user_id, input_data, idempotency_key=_rating_job_key(rating_id))
+    if job["status"] == "failed":
+        await retry_job(job, input_data)
+
+
+async def get_rating_status(rating_id: str, user_id: str) -> RatingStatusResponse:
+    """"ready" with the result, "pending" while its job is queued or running, "failed" once the job gave up."""
+    cached = await rating_cache.get(rating_id)
+    if cached:
+        return RatingStatusResponse(rating_id=rating_id, status="ready", result=RatingResponse(**cached))
+    job = await find_job(user_id, _rating_job_key(rating_id))
+    if job and job["status"] == "succeeded" and job.get("result"):
+        return RatingStatusResponse(rating_id=rating_id, status="ready", result=RatingResponse(**job["result"]))
+    if job and job["status"] in ("queued", "running"):
+        return RatingStatusResponse(rating_id=rating_id, status="pending")
+    # The job failed, or there is none left (never started or expired) to produce the rating
+    return RatingStatusResponse(rating_id=rating_id, status="failed")
+
+
+# Answers rated per LLM call by the batch endpoint; batches run concurrently
+RATING_BATCH_SIZE = int(os.getenv("RATING_BATCH_SIZE", "5"))
+
+
+async def _rate_batch(batch: list) -> dict:
+    """
+    Rate a batch of (index, RatingRequest dict) pairs with one prompt.
+
+    Answers the model skipped (or the whole batch, if the call failed) are
+    rated one by one. Returns {index: RatingResponse} for every answer that
+    got a rating and writes those to the rating cache.
+    """
+    answers = json.dumps([{"index": index, **item} for index, item in batch], ensure_ascii=False)
+    try:
+        result = await _invoke_llms("rating_batch", {"answers": answers})
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        logging.exception("Error generating AI response for batch rating")
+        result = None
+
+    wanted = {index for index, _ in batch}
+    rated = {}
+    for rating in (result.ratings if result else []):
+        if rating.index in wanted and rating.index not in rated:
+            rated[rating.index] = RatingResponse(**rating.model_dump(exclude={"index"}))
+
+    missing = [(index, item) for index, item in batch if index not in rated]
+    if missing:
+        logging.warning(f"Batch rating missed {len(missing)} of {len(batch)} answers, rating them individually")
+        singles = await asyncio.gather(*(_invoke_llms("rating", item) for _, item in missing), return_exceptions=True)
+        for (index, _), single in zip(missing, singles):
+            if isinstance(single, RatingResponse):
+                rated[index] = single
+
+    for index, item in batch:
+        if index in rated:
+            await rating_cache.set(rating_cache_key(item), rated[index].model_dump())
+    return rated
+
+
+async def stream_mock_ratings(items: list):
+    """
+    Rate every answer of a mock interview, yielding (index, RatingResponse) as
+    each rating is ready. Cached ratings come first; the rest are split into
+    RATING_BATCH_SIZE prompts that run concurrently. Answers that could not be
+    rated are not yielded.
+    """
+    cached = await asyncio.gather(*(rating_cache.get(rating_cache_key(item)) for item in items))
+    pending = []
+    for index, (item, hit) in enumerate(zip(items, cached)):
+        if hit:
+            yield index, RatingResponse(**hit)
+        else:
+            pending.append((index, item))
+    if not pending:
+        return
+
+    logging.info(f"Rating {len(pending)} answers ({len(items) - len(pending)} cached) in batches of {RATING_BATCH_SIZE}")
+    tasks = [
+        asyncio.create_task(_rate_batch(pending[start:start + RATING_BATCH_SIZE]))
+        for start in range(0, len(pending), RATING_BATCH_SIZE)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            rated = await next_done
+            for index in sorted(rated):
+                yield index, rated[index]
+    finally:
+        # The client may stop reading early (e.g. SSE disconnect)
+        for task in tasks:
+            task.cancel()
+
+
+async def get_mock_ratings(items: list):
+    """Batch variant of get_mock_rating: one RatingResponse per item, in input order."""
+    ratings = {}
+    try:
+        async for index, rating in stream_mock_ratings(items):
+            ratings[index] = rating
+    except DeadlineExceeded:
+        raise _deadline_exceeded()
+
+    if len(ratings) < len(items):
+        raise HTTPException(
+            status_code=502,
+            detail={
+                "error": "Rating Failed",
+                "message": f"Could not rate {len(items) - len(ratings)} of {len(items)} answers, please try again.",
+                "code": 3001
+            }
+        )
+    return [ratings[index] for index in range(len(items))]
+
+
+async def stream_questions_from_resume(input_data: dict, user_id: str = None):
+    """Streaming variant of get_questions_from_resume: yields each SingleQues as soon as it is generated."""
+    async for question in _stream_with_bank("questions", SingleQues, input_data, user_id):
+        yield question
+
+
+async def stream_mock_questions(input_data: dict, user_id: str = None):
+    """Streaming variant of get_mock_questions: yields each MockQuestion as soon as it is generated."""
+    async for question in _stream_with_bank("mock_questions", MockQuestion, input_data, user_id):
+        yield question
+
+
+# --------- Chain Registry ---------
+QUESTIONS_INPUTS = ["resume_text", "num_questions", "difficulty_level", "interview_type", "interview_description", "target_companies"]
+MOCK_QUESTIONS_INPUTS = ["resume_text", "num_questions", "difficulty_level", "interview_type", "job_description"]
+
+
+def _prompt(template: str, input_variables: list, schema=None, **partials):
+    if schema is not None:
+        partials["format_instructions"] = PydanticOutputParser(pydantic_object=schema).get_format_instructions()
+    return PromptTemplate(template=template, input_variables=input_variables, partial_variables=partials)
+
+
+def _context_split(prefix: str, resume_segment: str, tail: str, input_variables: list, schema):
+    """
+    (prefix prompt, tail prompt) for a prefix-stable template: the prefix covers
+    the static instructions, output format and resume, the tail the per-request fields.
+    """
+    tail_variables = [name for name in input_variables if name != "resume_text"]
+    return _prompt(prefix + resume_segment, ["resume_text"], schema), PromptTemplate(template=tail, input_variables=tail_variables)
+
+
+def build_chain_registry(providers) -> ChainRegistry:
+    """Compile every task's prompt/parser pair for every provider (runs once at import/startup)."""
+    registry = ChainRegistry(providers)
+
+    registry.register(
+        "parse_resume",
+        _prompt(parse_resume_prompt, ["resume_text"], ParsedResume),
+        PydanticOutputParser(pydantic_object=ParsedResume),
+    )
+    for section, (schema, _) in RESUME_SECTION_PARSERS.items():
+        registry.register(
+            f"resume_section:{section}",
+            _prompt(resume_section_prompt, ["section_text"], schema,
+                    section_name=section, section_instructions=resume_section_instructions[section]),
+            PydanticOutputParser(pydantic_object=schema),
+        )
+
+    for task, template, (prefix, resume_segment, tail), inputs, schema in (
+        ("questions", questions_prompt, (questions_prompt_prefix, questions_resume_segment, questions_prompt_tail),
+         QUESTIONS_INPUTS, QuestionListResponse),
+        ("mock_questions", mock_question_prompt, (mock_question_prompt_prefix, mock_question_resume_segment, mock_question_prompt_tail),
+         MOCK_QUESTIONS_INPUTS, MockResponse),
+    ):
+        prompt = _prompt(template, inputs, schema)
+        # The three variants share the same prefix, so they share one context cache entry per resume
+        prefix_prompt, tail_prompt = _context_split(prefix, resume_segment, tail, inputs, schema)
+        registry.register(task, prompt, PydanticOutputParser(pydantic_object=schema),
+                          context_split=(prefix_prompt, tail_prompt))
+        registry.register(f"{task}_batch", prompt + batch_focus_suffix, PydanticOutputParser(pydantic_object=schema),
+                          context_split=(prefix_prompt, tail_prompt + batch_focus_suffix))
+        registry.register(f"{task}_stream", prompt, JsonOutputParser(),
+                          context_split=(prefix_prompt, tail_prompt))
+
+    registry.register(
+        "rating",
+        _prompt(rating_prompt, ["question", "expected_answer", "user_answer"], RatingResponse),
+        PydanticOutputParser(pydantic_object=RatingResponse),
+    )
+    registry.register(
+        "rating_batch",
+        _prompt(rating_batch_prompt, ["answers"], IndexedRatingList),
+        PydanticOutputParser(pydantic_object=IndexedRatingList),
+    )
+    registry.register("bot", ChatPromptTemplate.from_messages([("human", "{question}")]), StrOutputParser())
+
+    registry.log_summary()
+    return registry
+
+
+chain_registry = build_chain_registry(llms)
@@ -0,0 +1,142 @@
+"""
+Background pre-generation of question sets after a resume is written.
+
+Users nearly always go from uploading a resume straight to generating
+questions, usually with the default request values. After every resume write
+we generate, one set at a time, the default and last-used question sets for
+that resume and store them keyed by (user, task, request parameters, resume
+version). The matching /get_questions or /mock/get_questions request then takes
+its set instead of waiting on the LLM. Sets for older resume versions are
+deleted on the next write and expire after PREGENERATION_TTL_SECONDS anyway.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from connections.mongo_client import MongoDBClient
+from llms.priority import llm_priority
+from models.schemas import QuestionRequest, MockQuestionRequest
+from utils.logger import logging
+from utils.main_utils import get_questions_from_resume, get_mock_questions
+
+PREGENERATION_ENABLED = os.getenv("QUESTION_PREGENERATION_ENABLED", "true").lower() == "true"
+PREGENERATION_TTL_SECONDS = int(os.getenv("QUESTION_PREGENERATION_TTL_SECONDS", str(24 * 3600)))
+
+COLLECTION = "PregeneratedQuestions"
+PARAMS_COLLECTION = "QuestionParams"
+
+# task -> (request model with the default parameters, generator)
+TASKS = {
+    "questions": (QuestionRequest, get_questions_from_resume),
+    "mock_questions": (MockQuestionRequest, get_mock_questions),
+}
+
+_client = MongoDBClient()
+_indexed = False
+
+
+def _hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+def resume_version(resume: dict) -> str:
+    """Content hash of a ParsedResume dump; any edit to the resume changes it."""
+    return _hash(resume)[:16]
+
+
+def _set_key(user_id: str, task: str, input_data: dict) -> str:
+    params = {name: value for name, value in input_data.items() if name != "resume_text"}
+    return f"{user_id}:{task}:{_hash(params)[:16]}:{resume_version(input_data['resume_text'])}"
+
+
+async def _ensure_indexes() -> None:
+    global _indexed
+    if not _indexed:
+        collection = _client.get_collection(COLLECTION)
+        await collection.create_index("key", unique=True)
+        await collection.create_index("created_at", expireAfterSeconds=PREGENERATION_TTL_SECONDS)
+        _indexed = True
+
+
+async def remember_params(user_id: str, task: str, params: dict) -> None:
+    """Record the parameters of the user's latest request so the next resume write pre-generates them too."""
+    try:
+        await _client.update_one(
+            PARAMS_COLLECTION,
+            {"user_id": user_id, "task": task},
+            {"user_id": user_id, "task": task, "params": params, "updated_at": datetime.now(timezone.utc)},
+            upsert=True,
+        )
+    except Exception:
+        logging.exception(f"Could not record question parameters for user_id: {user_id}")
+
+
+async def take_pregenerated(user_id: str, task: str, input_data: dict) -> Optional[dict]:
+    """Claim the pre-generated set matching this exact request, if there is one; each set is served once."""
+    if not PREGENERATION_ENABLED:
+        return None
+    try:
+        doc = await _client.get_collection(COLLECTION).find_one_and_delete({"key": _set_key(user_id, task, input_data)})
+    except Exception:
+        logging.exception("Pre-generated question lookup failed")
+        return None
+    if doc:
+        logging.info(f"Serving pre-generated {task} for user_id: {user_id}")
+        return doc["result"]
+    return None
+
+
+async def pregenerate_questions(user_id: str, resume: dict) -> None:
+    """
+    Background task run after a resume write: drop sets built for older
+    versions of the resume, then generate the default and last-used sets for
+    each task, one at a time so live requests keep the providers.
+    """
+    if not PREGENERATION_ENABLED:
+        return
+    version = resume_version(resume)
+    try:
+        await _ensure_indexes()
+        collection = _client.get_collection(COLLECTION)
+        await collection.delete_many({"user_id": user_id, "resume_version": {"$ne": version}})
+    except Exception:
+        logging.exception(f"Could not invalidate pre-generated questions for user_id: {user_id}")
+        return
+
+    for task, (request_model, generate) in TASKS.items():
+        param_sets = [request_model().model_dump()]
+        try:
+            last_used = await _client.find_one(PARAMS_COLLECTION, {"user_id": user_id, "task": task})
+        except Exception:
+            last_used = None
+        if last_used and last_used["params"] not in param_sets:
+            param_sets.append(last_used["params"])
+
+        for params in param_sets:
+            input_data = {**params, "resume_text": resume}
+            key = _set_key(user_id, task, input_data)
+            try:
+                if await collection.find_one({"key": key}, {"_id": 1}):
+                    continue
+                # Speculative work: runs in the smallest scheduler share, behind live requests
+                with llm_priority("background"):
+                    result = await generate(input_data, user_id)
+                if not result:
+                    continue
+                await collection.update_one(
+                    {"key": key},
+                    {"$set": {
+                        "key": key,
+                        "user_id": user_id,
+                        "task": task,
+                        "resume_version": version,
+                        "result": result.model_dump(),
+                        "created_at": datetime.now(timezone.utc),
+                    }},
+                    upsert=True,
+                )
+                logging.info(f"Pre-generated {task} for user_id: {user_id}")
+            except Exception:
+                logging.exception(f"Pre-generating {task} failed for user_id: {user_id}")
@@ -25,10 +25,49 @@ Resume Text:
 {resume_text}
 """
 
-questions_prompt = """
+resume_section_prompt = """
+You are a strict resume parser.
+
+Your ONLY task:
+- Read the given {section_name} section(s) of a resume.
+- Extract only the fields listed below, exactly as specified.
+{section_instructions}
+
+### Output Format (JSON):
+{format_instructions}
+
+Resume Section Text:
+{section_text}
+"""
+
+resume_section_instructions = {
+    "profile": """- `name`: the candidate's full name.
+- `skills`: every technical and professional skill mentioned. Return [] if none.
+- `required_roles`: job roles the candidate is targeting or is suited for. Return [] if none.""",
+    "experience": """- For `experience`: extract the total years of professional work experience (full-time jobs + internships).
+  Count only work experience, NOT education years. If not explicitly stated, estimate from job date ranges.
+  Return as an integer (e.g. 2 for 2 years). Return null if no experience is found.
+- For `work_experiences`: extract each past job/internship as a separate entry with:
+    - `company`: company or organization name
+    - `role`: job title or role held
+    - `description`: brief summary of responsibilities and achievements (2-3 sentences max)
+    - `duration`: employment period as a string (e.g. "Jan 2022 - Mar 2023", "2021 - Present")
+  Include ALL work entries found (full-time, part-time, internships). Return [] if none found.""",
+    "education": """- `education`: one string per degree or qualification, including institution and years. Return [] if none.""",
+    "projects": """- For `projects`: extract each project as an object with exactly two fields:
+    - `name`: the project name (string)
+    - `description`: a brief description of the project (1-2 sentences max)
+  Return [] if no projects are found.""",
+}
+
+# The question prompts are laid out prefix-stable: static instructions and
+# format first, then the candidate's resume, then the per-request fields. Every
+# call for the same resume then shares its prompt prefix up to the end of the
+# resume segment, which lets providers reuse it (see llms.context_cache).
+questions_prompt_prefix = """
 You are an interview question generator.
 
-Inputs you receive:
+Inputs you receive (after the output format):
 - Candidate's resume text
 - Target company
 - Job description
@@ -37,8 +76,8 @@ Inputs you receive:
 - Number of questions
 
 Your task:
-Generate exactly {num_questions} {difficulty_level}-level multiple-choice interview questions
-tailored to the candidate, the company, and the job description.
+Generate multiple-choice interview questions tailored to the candidate, the company, and the job description,
+in the number and difficulty level given at the end.
 
 Rules for question generation:
 - Mix questions from **skills, projects, and core concepts** (don’t only focus on projects).
@@ -51,15 +90,20 @@ Rules for question generation:
 - Company-specific twist: If the target company is known for something (e.g., FAANG → scalability, startups → hands-on ML), reflect that in the questions.
 - Skills mentioned in the resume **must appear in at least 40% of the questions if test type is "technical"**.
 - The "answers" list must contain only the exact text of the correct option (must match one option exactly).
+- Set "resume_specific" to true for a question about the candidate's own projects, employers or experience, false for one any candidate for the role could be asked.
 - Do not include any text outside the dictionary.
 - Ensure the dictionary is valid Python syntax and can be parsed with ast.literal_eval().
 
 ### Output Format (JSON):
 {format_instructions}
+"""
 
+questions_resume_segment = """
 Candidate Resume:
 {resume_text}
+"""
 
+questions_prompt_tail = """
 Target Company:
 {target_companies}
 
@@ -68,24 +112,21 @@ Job Description:
 
 Test Type:
 {interview_type}
+
+Generate exactly {num_questions} {difficulty_level}-level multiple-choice interview questions.
 """
 
+questions_prompt = questions_prompt_prefix + questions_resume_segment + questions_prompt_tail
+
 
 
-mock_question_prompt = """
+mock_question_prompt_prefix = """
 You are an expert interview coach and professional interviewer.  
 Your task is to generate a set of mock interview questions and their ideal answers.  
 The questions must be tailored to the candidate’s resume, the job description, and the interview type.
 
-### Input Details:
-- Number of questions: {num_questions}
-- Difficulty level: {difficulty_level}   # easy, medium, hard
-- Job description: {job_description}
-- Interview type: {interview_type}       # behavioral, technical, coding, system design, HR, etc.
-- Candidate resume text: {resume_text}   # includes skills, projects, experience
-
 ### Instructions:
-1. Generate exactly {num_questions} interview questions.  
+1. Generate exactly the number of interview questions given in the input details.  
 2. Questions must be relevant to the candidate’s resume and the job description.  
 3. Ensure the tone and complexity of the questions match the given difficulty level.  
 4. Each question must include:  
@@ -94,10 +135,26 @@ The questions must be tailored to the candidate’s resume, the job description,
 5. For **behavioral interviews**, focus on STAR format (Situation, Task, Action, Result).  
 6. For **technical/coding interviews**, include problem statements and concise solution explanations (not full code unless necessary).  
 7. Keep answers clear, structured, and suitable for rating/scoring later.  
+8. Set `resume_specific` to true for a question about the candidate’s own projects, employers or experience, false for one any candidate for the role could be asked.  
 
 ### Output Format (JSON):
 {format_instructions}
 """
+
+mock_question_resume_segment = """
+### Candidate resume (skills, projects, experience):
+{resume_text}
+"""
+
+mock_question_prompt_tail = """
+### Input Details:
+- Number of questions: {num_questions}
+- Difficulty level: {difficulty_level}   # easy, medium, hard
+- Job description: {job_description}
+- Interview type: {interview_type}       # behavioral, technical, coding, system design, HR, etc.
+"""
+
+mock_question_prompt = mock_question_prompt_prefix + mock_question_resume_segment + mock_question_prompt_tail
 rating_prompt = """
 You are an expert interview evaluator.  
 Your task is to rate the candidate’s answer compared to the expected answer and question.
@@ -126,3 +183,42 @@ he will try to keep it concise by covering almost all aspects.
 ### Output Format (JSON):
 {format_instructions}
 """
+
+rating_batch_prompt = """
+You are an expert interview evaluator.  
+Your task is to rate each of the candidate’s answers below, comparing it to its expected answer and question.
+user is giving an interview he may give less detailed answer than expected but the main point is whether user is covering important points or not.
+he will try to keep it concise by covering almost all aspects.
+
+### Input
+A JSON list of answers, each with an `index`, `question`, `expected_answer` and `user_answer`:
+{answers}
+
+### Evaluation Process
+Rate every answer on its own; do not let one answer affect another's rating.
+1. Extract key points from the expected answer.  
+2. Check how many of those key points appear in the candidate's answer (paraphrases count).  
+3. Rate strictly on coverage and correctness, not on length or polish.  
+4. Give extra credit if the candidate includes real examples.  
+
+### Rating Scale
+- above 4.5 = Covers nearly all key points, accurate, with examples.  
+- above 4 = Covers most key points, minor gaps.  
+- above 3 = Covers some key points, but misses several.  
+- less than 2.5 = Few key points, vague/unclear.  
+- less than 1.5 = Barely relevant.  
+- 0 = Wrong or no answer.  
+
+Return exactly one rating per input answer, with the same `index`.
+
+### Output Format (JSON):
+{format_instructions}
+"""
+
+batch_focus_suffix = """
+
+### Batch Focus:
+This is batch {batch_index} of {batch_count} generated in parallel for the same candidate.
+Concentrate this batch on: {batch_focus}.
+Avoid generic questions that other batches are likely to ask as well.
+"""
@@ -0,0 +1,63 @@
+"""
+Instant, local estimate of a mock answer's rating.
+
+Blends sentence-embedding similarity and keyword coverage between the user's
+answer and the expected answer into a 0-5 score. It is shown while the LLM
+rating (with feedback and a better answer) is computed in the background.
+"""
+import os
+import re
+
+from utils.embeddings import embed, cosine
+
+# Share of the score that comes from keyword coverage; the rest is embedding similarity
+KEYWORD_WEIGHT = float(os.getenv("PROVISIONAL_KEYWORD_WEIGHT", "0.4"))
+# Cosine similarity at or below this counts as unrelated (MiniLM rarely scores real text below ~0.2)
+SIMILARITY_FLOOR = float(os.getenv("PROVISIONAL_SIMILARITY_FLOOR", "0.2"))
+
+NON_ANSWERS = {"", "i don't know", "i dont know", "idk", "no idea", "not sure", "pass", "skip", "na", "n/a"}
+
+_STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "your", "with", "this", "that", "from", "they", "them",
+    "their", "there", "then", "than", "have", "has", "had", "was", "were", "will", "would", "can", "could",
+    "should", "into", "onto", "also", "its", "our", "out", "use", "used", "using", "which", "when", "where",
+    "what", "who", "how", "why", "all", "any", "each", "more", "most", "other", "some", "such", "only", "own",
+    "same", "very", "just", "like", "about", "because", "been", "being", "does", "doing", "over", "under",
+    "these", "those", "while", "both", "between", "through", "example",
+}
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def _keywords(text: str) -> set:
+    return {_stem(word) for word in _WORD_RE.findall(text.lower()) if len(word) > 2 and word not in _STOPWORDS}
+
+
+def keyword_coverage(user_answer: str, expected_answer: str) -> float:
+    """Fraction of the expected answer's keywords that appear in the user's answer."""
+    expected = _keywords(expected_answer)
+    if not expected:
+        return 0.0
+    return len(expected & _keywords(user_answer)) / len(expected)
+
+
+async def provisional_rating(expected_answer: str, user_answer: str) -> float:
+    """0-5 score rounded to one decimal; keyword coverage alone when embeddings are unavailable."""
+    if " ".join(user_answer.lower().split()).strip(" .!") in NON_ANSWERS:
+        return 0.0
+
+    coverage = keyword_coverage(user_answer, expected_answer)
+    vectors = await embed([expected_answer, user_answer])
+    if vectors is None:
+        score = coverage
+    else:
+        similarity = (cosine(*vectors) - SIMILARITY_FLOOR) / (1 - SIMILARITY_FLOOR)
+        similarity = min(1.0, max(0.0, similarity))
+        score = (1 - KEYWORD_WEIGHT) * similarity + KEYWORD_WEIGHT * coverage
+    return round(5 * score, 1)
@@ -0,0 +1,215 @@
+"""
+Persistent bank of generated interview questions.
+
+Generated SingleQues / MockQuestion items that don't depend on the
+candidate's resume (the model flags them with `resume_specific=false`, and
+questions naming the candidate's projects or employers are skipped anyway)
+are stored with their interview type, difficulty, a scope for the role and
+target companies they were generated for, the taxonomy skills they mention
+and (when sentence-transformers is installed) an embedding. Before
+generating, `retrieve` fills up to QUESTION_BANK_MAX_SHARE of the request
+from the bank, from questions with the same scope that match the resume's
+skills, skipping questions the user has already answered in TestResults;
+the rest is generated fresh for this resume.
+"""
+import asyncio
+import hashlib
+import os
+import random
+from datetime import datetime, timezone
+from typing import List, Optional, Set
+
+from pymongo import UpdateOne
+
+from connections.mongo_client import MongoDBClient
+from utils.embeddings import embed, cosine
+from utils.logger import logging
+from utils.resume_preextract import extract_skills
+
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "true").lower() == "true"
+# Upper bound on the share of a request served from the bank; the rest is always tailored to the resume
+QUESTION_BANK_MAX_SHARE = float(os.getenv("QUESTION_BANK_MAX_SHARE", "0.5"))
+# Candidates pulled from Mongo per requested question before ranking
+CANDIDATES_PER_QUESTION = 5
+MAX_CANDIDATES = 200
+
+COLLECTION = "QuestionBank"
+
+_client = MongoDBClient()
+_indexed = False
+# Keeps fire-and-forget store tasks referenced until they finish
+_pending: Set[asyncio.Task] = set()
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _question_hash(text: str) -> str:
+    return hashlib.sha256(normalize_question(text).encode()).hexdigest()
+
+
+def _resume_skills(input_data: dict) -> List[str]:
+    resume = input_data.get("resume_text") or {}
+    skills = resume.get("skills", []) if isinstance(resume, dict) else []
+    return [skill.lower() for skill in skills]
+
+
+def _scope(input_data: dict) -> str:
+    """Hash of the role and target companies a question was generated for; banked questions are only reused within it."""
+    role = input_data.get("job_description") or input_data.get("interview_description") or ""
+    companies = input_data.get("target_companies") or ""
+    return hashlib.sha256(f"{normalize_question(role)}\x1f{normalize_question(companies)}".encode()).hexdigest()[:16]
+
+
+def _resume_terms(input_data: dict) -> List[str]:
+    """The candidate's name, project names and employers: questions mentioning them are about this resume."""
+    resume = input_data.get("resume_text") or {}
+    if not isinstance(resume, dict):
+        return []
+    terms = [resume.get("name") or ""]
+    terms += [project.get("name") or "" for project in resume.get("projects") or []]
+    terms += [job.get("company") or "" for job in resume.get("work_experiences") or []]
+    return [normalize_question(term) for term in terms if len(term.strip()) > 2]
+
+
+def _bankable(question, payload: dict, resume_terms: List[str]) -> bool:
+    if getattr(question, "resume_specific", True):
+        return False
+    text = normalize_question(" ".join(str(value) for value in payload.values() if isinstance(value, str)))
+    return not any(term in text for term in resume_terms)
+
+
+def _query_text(input_data: dict) -> str:
+    """What a good question for this request should be about: the role plus the resume skills."""
+    role = input_data.get("job_description") or input_data.get("interview_description") or ""
+    return f"{input_data.get('interview_type', '')} {role}. Skills: {', '.join(_resume_skills(input_data))}"
+
+
+async def _ensure_indexes() -> None:
+    global _indexed
+    if not _indexed:
+        collection = _client.get_collection(COLLECTION)
+        await collection.create_index([("kind", 1), ("scope", 1), ("question_hash", 1)], unique=True)
+        await collection.create_index(
+            [("kind", 1), ("scope", 1), ("interview_type", 1), ("difficulty_level", 1), ("skills", 1), ("created_at", -1)]
+        )
+        _indexed = True
+
+
+async def seen_questions(user_id: Optional[str]) -> Set[str]:
+    """Hashes of every question the user has answered in a saved test."""
+    if not user_id:
+        return set()
+    cursor = _client.get_collection("TestResults").find({"user_id": user_id}, {"questions_data.question": 1})
+    seen = set()
+    async for test in cursor:
+        for question in test.get("questions_data", []):
+            if question.get("question"):
+                seen.add(_question_hash(question["question"]))
+    return seen
+
+
+async def retrieve(kind: str, input_data: dict, user_id: Optional[str] = None) -> List[dict]:
+    """
+    Up to `num_questions` (times QUESTION_BANK_MAX_SHARE) banked questions for
+    this request, as question payload dicts. Candidates share the scope (role
+    and target companies), interview type and difficulty and either cover one
+    of the resume skills or are not tied to a skill at all; the newest ones are
+    ranked by skill overlap plus, when available, embedding similarity to the
+    request. Bank failures return [].
+    """
+    if not QUESTION_BANK_ENABLED:
+        return []
+    count = int(input_data["num_questions"] * QUESTION_BANK_MAX_SHARE)
+    if count <= 0:
+        return []
+
+    skills = _resume_skills(input_data)
+    try:
+        await _ensure_indexes()
+        seen = await seen_questions(user_id)
+        query = {
+            "kind": kind,
+            "scope": _scope(input_data),
+            "interview_type": input_data.get("interview_type", "").lower(),
+            "difficulty_level": input_data.get("difficulty_level", "").lower(),
+            "$or": [{"skills": {"$in": skills}}, {"skills": []}],
+            "question_hash": {"$nin": list(seen)},
+        }
+        candidates = await _client.find_many(
+            COLLECTION, query, limit=min(MAX_CANDIDATES, count * CANDIDATES_PER_QUESTION), sort=[("created_at", -1)]
+        )
+    except Exception:
+        logging.exception("Question bank lookup failed")
+        return []
+
+    if not candidates:
+        return []
+
+    query_vector = None
+    if any(doc.get("embedding") for doc in candidates):
+        vectors = await embed([_query_text(input_data)])
+        query_vector = vectors[0] if vectors else None
+
+    wanted = set(skills)
+
+    def score(doc) -> float:
+        overlap = len(wanted & set(doc["skills"])) / max(1, len(doc["skills"]))
+        similarity = cosine(query_vector, doc["embedding"]) if query_vector and doc.get("embedding") else 0.0
+        # A little jitter so users with the same profile don't all get the same set
+        return overlap + similarity + random.uniform(0, 0.1)
+
+    picked = sorted(candidates, key=score, reverse=True)[:count]
+    logging.info(f"Question bank served {len(picked)} of {input_data['num_questions']} {kind}")
+    return [doc["question"] for doc in picked]
+
+
+async def store(kind: str, input_data: dict, questions: list) -> None:
+    """
+    Upsert the generated questions (pydantic models) that don't depend on the
+    resume into the bank; existing entries are left untouched.
+    """
+    if not QUESTION_BANK_ENABLED or not questions:
+        return
+    resume_terms = _resume_terms(input_data)
+    payloads = [question.model_dump() for question in questions]
+    payloads = [payload for question, payload in zip(questions, payloads) if _bankable(question, payload, resume_terms)]
+    if not payloads:
+        return
+    texts = [payload["question"] for payload in payloads]
+    vectors = await embed(texts) or [None] * len(texts)
+
+    now = datetime.now(timezone.utc)
+    operations = []
+    scope = _scope(input_data)
+    for payload, text, vector in zip(payloads, texts, vectors):
+        context = " ".join(str(value) for value in payload.values() if isinstance(value, str))
+        doc = {
+            "kind": kind,
+            "question_hash": _question_hash(text),
+            "scope": scope,
+            "interview_type": input_data.get("interview_type", "").lower(),
+            "difficulty_level": input_data.get("difficulty_level", "").lower(),
+            "skills": [skill.lower() for skill in extract_skills(context)],
+            "question": payload,
+            "embedding": vector,
+            "created_at": now,
+        }
+        operations.append(UpdateOne(
+            {"kind": kind, "scope": doc["scope"], "question_hash": doc["question_hash"]}, {"$setOnInsert": doc}, upsert=True
+        ))
+    try:
+        await _ensure_indexes()
+        await _client.get_collection(COLLECTION).bulk_write(operations, ordered=False)
+    except Exception:
+        logging.exception("Question bank write failed")
+
+
+def store_in_background(kind: str, input_data: dict, questions: list) -> None:
+    """Bank freshly generated questions without holding up the response."""
+    if not QUESTION_BANK_ENABLED or not questions:
+        return
+    task = asyncio.create_task(store(kind, input_data, list(questions)))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
@@ -0,0 +1,183 @@
+"""
+Deterministic pre-extraction for resume parsing.
+
+Pulls out the fields that don't need an LLM (email, skills from a known
+taxonomy), splits the text into sections, and drops boilerplate so only the
+residual sections are sent to the model.
+"""
+import re
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from utils.logger import logging
+
+# Bump when the rules below change so cached parses are invalidated
+PRE_EXTRACTION_VERSION = "3"
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"\+?\d[\d\s().-]{8,}\d")
+MIN_PHONE_DIGITS = 10   # keeps date ranges like "2019 - 2023" out of PHONE_RE matches
+URL_RE = re.compile(r"(https?://\S+|www\.\S+|linkedin\.com/\S+|github\.com/\S+)", re.IGNORECASE)
+PAGE_NUMBER_RE = re.compile(r"^\s*(page\s*)?\d+\s*(of\s*\d+)?\s*$", re.IGNORECASE)
+BOILERPLATE_LINE_RE = re.compile(
+    r"(references? (are )?available (up)?on request|curriculum vitae|^resume$|^cv$)",
+    re.IGNORECASE,
+)
+
+# Canonical skill names; matching is case-insensitive and returns these spellings.
+# Resumes are only matched inside their skills section: elsewhere names like
+# "Excel", "Swift" or "Spark" are as likely to be ordinary words.
+SKILLS_TAXONOMY = [
+    "Python", "Java", "JavaScript", "TypeScript", "C", "C++", "C#", "Go", "Rust", "Kotlin", "Swift",
+    "Ruby", "PHP", "Scala", "R", "MATLAB", "SQL", "Bash", "HTML", "CSS", "Dart",
+    "React", "React Native", "Angular", "Vue", "Next.js", "Node.js", "Express", "Django", "Flask",
+    "FastAPI", "Spring Boot", "Flutter", "Tailwind CSS", "Redux", "GraphQL", "REST APIs",
+    "MongoDB", "PostgreSQL", "MySQL", "SQLite", "Redis", "Elasticsearch", "Cassandra", "DynamoDB", "Firebase",
+    "AWS", "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "Jenkins", "GitHub Actions", "CI/CD",
+    "Git", "Linux", "Kafka", "RabbitMQ", "Spark", "Hadoop", "Airflow",
+    "Machine Learning", "Deep Learning", "NLP", "Computer Vision", "Data Analysis", "Data Structures",
+    "Algorithms", "System Design", "Microservices", "TensorFlow", "PyTorch", "Keras", "scikit-learn",
+    "Pandas", "NumPy", "Matplotlib", "OpenCV", "LangChain", "LangGraph", "Hugging Face", "Transformers",
+    "LLMs", "RAG", "Power BI", "Tableau", "Excel", "Figma", "Jira", "Agile", "Scrum",
+]
+
+# One compiled alternation over the whole taxonomy (longest names first so
+# "React Native" wins over "React"); the lookarounds stop "C" matching inside
+# "CSS" or "Go" inside "Google".
+_SKILL_RE = re.compile(
+    r"(?<![\w+#.])(?:"
+    + "|".join(re.escape(skill) for skill in sorted(SKILLS_TAXONOMY, key=len, reverse=True))
+    + r")(?![\w+#])",
+    re.IGNORECASE,
+)
+_CANONICAL_SKILL = {skill.lower(): skill for skill in SKILLS_TAXONOMY}
+# Single letters are too ambiguous outside an explicit skills section
+_AMBIGUOUS_SKILLS = {"c", "r", "go"}
+
+SECTION_HEADINGS = {
+    "summary": ["summary", "profile", "objective", "about me", "professional summary", "career objective"],
+    "education": ["education", "academic background", "academics", "qualifications", "educational qualifications"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "internships", "internship", "internship experience"],
+    "projects": ["projects", "personal projects", "academic projects", "key projects"],
+    "skills": ["skills", "technical skills", "core competencies", "technologies", "tech stack", "tools"],
+    "certifications": ["certifications", "certificates", "courses"],
+    "achievements": ["achievements", "awards", "honors", "accomplishments"],
+    "hobbies": ["hobbies", "interests", "extracurricular activities", "extra-curricular activities"],
+    "references": ["references"],
+    "declaration": ["declaration"],
+    "personal": ["personal details", "personal information"],
+}
+# Sections that never contribute to ParsedResume
+BOILERPLATE_SECTIONS = {"hobbies", "references", "declaration", "personal"}
+
+_HEADING_LOOKUP = {alias: name for name, aliases in SECTION_HEADINGS.items() for alias in aliases}
+_HEADING_RE = re.compile(r"^\s*[#*\-•]*\s*([A-Za-z &\-]{3,40}?)\s*:?\s*$")
+
+
+class PreExtractedResume(BaseModel):
+    email: Optional[str] = None
+    # Taxonomy skills listed in the resume's skills section
+    skills: List[str] = []
+    sections: Dict[str, str] = {}
+    residual_text: str = ""
+
+
+def extract_skills(text: str, allow_ambiguous: bool = False) -> List[str]:
+    """Taxonomy skills mentioned in `text`, in first-seen order."""
+    found = []
+    for match in _SKILL_RE.finditer(text):
+        key = match.group(0).lower()
+        if key in _AMBIGUOUS_SKILLS and not allow_ambiguous:
+            continue
+        skill = _CANONICAL_SKILL[key]
+        if skill not in found:
+            found.append(skill)
+    return found
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """Split resume text on recognised headings; text before the first heading goes to "header"."""
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    for line in text.splitlines():
+        match = _HEADING_RE.match(line)
+        heading = _HEADING_LOOKUP.get(match.group(1).strip().lower()) if match else None
+        if heading:
+            current = heading
+            sections.setdefault(current, [])
+            continue
+        sections[current].append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items() if any(l.strip() for l in lines)}
+
+
+def _drop_phone(match: re.Match) -> str:
+    digits = sum(ch.isdigit() for ch in match.group(0))
+    return "" if digits >= MIN_PHONE_DIGITS else match.group(0)
+
+
+def _clean(text: str) -> str:
+    """Drop contact details, page numbers and boilerplate lines; collapse blank runs."""
+    kept = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or PAGE_NUMBER_RE.match(stripped) or BOILERPLATE_LINE_RE.search(stripped):
+            continue
+        stripped = PHONE_RE.sub(_drop_phone, stripped)
+        stripped = URL_RE.sub("", EMAIL_RE.sub("", stripped)).strip(" |,;-•")
+        if stripped:
+            kept.append(stripped)
+    return "\n".join(kept)
+
+
+def pre_extract(resume_text: str) -> PreExtractedResume:
+    """Run every deterministic rule over the raw resume text."""
+    email = EMAIL_RE.search(resume_text)
+    sections = {name: _clean(body) for name, body in split_sections(resume_text).items()}
+    sections = {name: body for name, body in sections.items() if body}
+
+    skills = extract_skills(sections.get("skills", ""), allow_ambiguous=True)
+
+    residual = "\n\n".join(
+        f"{name.upper()}\n{body}" if name != "header" else body
+        for name, body in sections.items()
+        if name not in BOILERPLATE_SECTIONS
+    )
+    return PreExtractedResume(
+        email=email.group(0) if email else None,
+        skills=skills,
+        sections=sections,
+        residual_text=residual,
+    )
+
+
+def apply_pre_extracted(parsed: BaseModel, pre: PreExtractedResume) -> BaseModel:
+    """
+    Merge deterministic fields into the LLM's parse.
+
+    The regex email wins (the model only sees the residual text, which has
+    contact details stripped), and taxonomy skills from the resume's skills
+    section that the model missed are appended. Skills only mentioned
+    elsewhere are left to the model, which saw them in context. The merge is
+    validated against the parse's schema; an email the schema rejects (the
+    regex is looser than EmailStr) is dropped in favour of the model's.
+    """
+    update = {}
+    if pre.email:
+        if parsed.email and parsed.email.lower() != pre.email.lower():
+            logging.warning(f"LLM email {parsed.email} differs from pre-extracted {pre.email}; using pre-extracted")
+        update["email"] = pre.email
+
+    known = {skill.lower() for skill in parsed.skills}
+    missing = [skill for skill in pre.skills if skill.lower() not in known]
+    if missing:
+        update["skills"] = list(parsed.skills) + missing
+    if not update:
+        return parsed
+    try:
+        return type(parsed).model_validate({**parsed.model_dump(), **update})
+    except ValidationError:
+        logging.warning(f"Pre-extracted email {pre.email!r} is not valid; keeping the LLM's")
+        update.pop("email", None)
+        return type(parsed).model_validate({**parsed.model_dump(), **update})
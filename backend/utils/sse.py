@@ -0,0 +1,40 @@
+import json
+from typing import Any, AsyncIterator, Callable, Optional
+
+from utils.logger import logging
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# Disable proxy buffering so each event reaches the client as soon as it is written
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def question_events(
+    pregenerated: Optional[dict],
+    generate: Callable[[], AsyncIterator[Any]],
+    user_id: str,
+) -> AsyncIterator[str]:
+    """
+    Body of the question-stream endpoints: one `question` event per question,
+    from the pre-generated set when there is one and from `generate()`
+    otherwise, then `done` (or `error` with the number of questions sent).
+    """
+    count = 0
+    try:
+        if pregenerated:
+            for question in pregenerated["questions"]:
+                count += 1
+                yield sse_event("question", question)
+        else:
+            async for question in generate():
+                count += 1
+                yield sse_event("question", question.model_dump())
+    except Exception:
+        logging.exception(f"Question stream failed for user_id: {user_id}")
+        yield sse_event("error", {"message": "Question generation failed", "count": count})
+        return
+    yield sse_event("done", {"count": count})
@@ -0,0 +1,99 @@
+"""
+Resume upload handling shared by /upload_resume and /jobs/upload_resume.
+
+FastAPI parses (and spools) the whole multipart body before an endpoint runs,
+so the size limit is enforced by UploadSizeLimitMiddleware while the body is
+still being received: a declared Content-Length over the limit is rejected
+before any of the body is read, and a body without one is cut off as soon as
+it crosses the limit. read_resume_upload then checks the file itself and
+sniffs its type from the magic bytes.
+"""
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from utils.extraction import sniff_file_type, is_docx
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+# Slack for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_CHUNK_BYTES = 64 * 1024
+UPLOAD_PATHS = {"/upload_resume", "/jobs/upload_resume"}
+
+
+def invalid_file_type() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={
+            "error": "Invalid File Type",
+            "message": "Only PDF and DOCX files are allowed.",
+            "code": 2001
+        }
+    )
+
+
+def file_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={
+            "error": "File Too Large",
+            "message": "File size must not exceed 10MB.",
+            "code": 2002
+        }
+    )
+
+
+async def read_resume_upload(file: UploadFile) -> tuple[bytes, str]:
+    """
+    Read the upload into a single buffer, checking MAX_UPLOAD_BYTES after every chunk.
+    Returns the bytes and the sniffed type ("pdf" or "docx").
+    """
+    first = await file.read(UPLOAD_CHUNK_BYTES)
+    sniffed = sniff_file_type(first)
+    if sniffed is None:
+        raise invalid_file_type()
+
+    buffer = bytearray(first)
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        buffer.extend(chunk)
+        if len(buffer) > MAX_UPLOAD_BYTES:
+            raise file_too_large()
+
+    contents = bytes(buffer)
+    if sniffed == "zip":
+        if not is_docx(contents):
+            raise invalid_file_type()
+        return contents, "docx"
+    return contents, sniffed
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware that stops resume upload bodies over the limit while they are being received."""
+
+    def __init__(self, app, max_body_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            error = file_too_large()
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # Re-raised by FastAPI's body parsing and rendered like any HTTPException
+                    raise file_too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)